@@ -2,18 +2,52 @@
 
 from sentence_transformers import SentenceTransformer, util
 from keybert import KeyBERT
+from keybert.backend import BaseEmbedder
+from sklearn.feature_extraction.text import CountVectorizer
 import re
 from collections import defaultdict
 import os
 from transformers import pipeline
 from pathlib import Path
 import spacy
+import torch
 from spacy.tokenizer import Tokenizer
+from retrieval import build_section_index, select_candidates
+from dedup import find_near_duplicates
+from config import INFERENCE_SCHEDULER
+from scheduler import MicroBatchScheduler
 
 # --- Model Loading ---
 # Load SentenceTransformer and KeyBERT models once for efficiency
 model = SentenceTransformer('all-MiniLM-L6-v2')
-kw_model = KeyBERT(model)
+
+
+class SharedEncoderBackend(BaseEmbedder):
+    """
+    KeyBERT backend that encodes through embed(), so keyword extraction shares the scheduler's batches.
+    """
+
+    def embed(self, documents, verbose=False):
+        return embed(list(documents)).cpu().numpy()
+
+
+kw_model = KeyBERT(SharedEncoderBackend())
+
+# With INFERENCE_SCHEDULER=1, encode calls from concurrent analyses are merged into shared batches
+encoder_scheduler = MicroBatchScheduler(
+    lambda texts: model.encode(texts, convert_to_tensor=True, show_progress_bar=False), name="encoder"
+) if INFERENCE_SCHEDULER else None
+
+
+def embed(texts, show_progress_bar=False):
+    """
+    Encodes a string or a list of strings to tensors, through the shared scheduler when it is enabled.
+    """
+    if encoder_scheduler is None:
+        return model.encode(texts, convert_to_tensor=True, show_progress_bar=show_progress_bar)
+    if isinstance(texts, str):
+        return encoder_scheduler.submit([texts]).result()[0]
+    return encoder_scheduler.submit(texts).result()
 
 # --- Custom Tokenizer for spaCy to handle hyphens ---
 def create_custom_tokenizer(nlp):
@@ -41,7 +75,30 @@ except OSError:
 
 # --- Keyword Generation Functions ---
 
-def extract_dynamic_keywords(persona, task, challenge_info, top_n=20):
+def encode_keyword_candidates(text, budget=None, chunk_size=64):
+    """
+    Encodes a text and its KeyBERT candidate phrases (1-3 word n-grams, shortest first) through embed().
+    With a LatencyBudget, encoding goes chunk by chunk and stops once the keywords stage expires;
+    candidates not encoded by then are dropped. Returns (candidates, candidate_embeddings, text_embedding).
+    """
+    candidates = list(dict.fromkeys(CountVectorizer(ngram_range=(1, 3), stop_words='english').build_analyzer()(text)))
+    texts = [text] + candidates
+    chunks = []
+    for start in range(0, len(texts), chunk_size):
+        if budget and budget.expired("keywords"):
+            if chunks:
+                budget.degrade("keywords", f"ranked KeyBERT phrases from {start - 1} of {len(candidates)} candidates")
+            else:
+                budget.degrade("keywords", "skipped KeyBERT phrase keywords, using simple keywords only")
+            break
+        chunks.append(embed(texts[start:start + chunk_size]))
+    if not chunks:
+        return [], None, None
+    embeddings = torch.cat(chunks)
+    return candidates[:len(embeddings) - 1], embeddings[1:], embeddings[0]
+
+
+def extract_dynamic_keywords(persona, task, challenge_info, top_n=20, budget=None):
     """
     (Original Function) Extracts, ranks, and filters task-specific KEYPHRASES.
     """
@@ -56,18 +113,25 @@ def extract_dynamic_keywords(persona, task, challenge_info, top_n=20):
     )
     top_n_keybert_initial = top_n
     min_similarity_threshold = 0.2
+    # The query and candidates are encoded once here and handed to KeyBERT and the re-ranking below
+    candidates, candidate_embeddings, query_embedding = encode_keyword_candidates(combined_query_text, budget=budget)
+    if not candidates:
+        return set()
+    candidate_rows = {candidate: row for row, candidate in enumerate(candidates)}
     initial_keybert_phrases = kw_model.extract_keywords(
         combined_query_text,
+        candidates=candidates,
         keyphrase_ngram_range=(1, 3),
         stop_words='english',
-        top_n=top_n_keybert_initial
+        top_n=top_n_keybert_initial,
+        doc_embeddings=query_embedding.reshape(1, -1).cpu().numpy(),
+        word_embeddings=candidate_embeddings.cpu().numpy()
     )
     initial_keywords_set = set(kw[0].lower() for kw in initial_keybert_phrases)
-    query_embedding = model.encode(combined_query_text, convert_to_tensor=True, show_progress_bar=False)
     ranked_keywords_with_scores = []
     if initial_keywords_set:
         keyword_texts = list(initial_keywords_set)
-        keyword_embeddings = model.encode(keyword_texts, convert_to_tensor=True, show_progress_bar=False)
+        keyword_embeddings = candidate_embeddings[[candidate_rows[kw_text] for kw_text in keyword_texts]]
         similarities = util.cos_sim(query_embedding, keyword_embeddings)[0]
         for i, kw_text in enumerate(keyword_texts):
             score = similarities[i].item()
@@ -183,34 +247,14 @@ def compute_weighted_score(query_embed, para, para_embed, phrase_keywords, simpl
     return sim_score + phrase_bonus + simple_keyword_bonus + title_boost + filename_keyword_boost
 
 
-# --- Main Analyzer Function ---
-
-# In src/analyzer.py, replace the entire analyze_persona_job function with this one.
-# In src/analyzer.py
-
-# In src/analyzer.py
+# --- Section Segmentation ---
 
-def analyze_persona_job(parsed_docs, persona, task, challenge_info, all_outlines_data, max_results=8):
+def segment_sections(parsed_docs, all_outlines_data):
     """
-    Analyzes documents by extracting full text between headings, correctly handles
-    sections that span multiple pages, and includes all scoring features.
-    (Optimized for batch processing)
+    Extracts the full text between consecutive headings of every document, including
+    sections that span multiple pages. Query-independent, so it can run once at ingestion.
     """
-    query = f"{persona['role']} needs to: {task['task']}"
-    query_embed = model.encode(query, convert_to_tensor=True, show_progress_bar=False)
-
-    # --- TIERED KEYWORD GENERATION ---
-    phrase_keywords = extract_dynamic_keywords(persona, task, challenge_info, top_n=30)
-    simple_keywords = extract_keywords_simple(task['task'])
-    print(f"Analyzer: Phrase Keywords for context: {phrase_keywords}")
-    print(f"Analyzer: Simple Keywords for high-importance bonus: {simple_keywords}")
-
-    # --- NEW: Identify the job constraints from simple keywords ---
-    is_veg_request = 'vegetarian' in simple_keywords
-    is_gluten_free_request = 'gluten-free' in simple_keywords or 'gluten' in simple_keywords
-    
-    # --- STEP 1: Collect all sections and their metadata first ---
-    sections_to_process = []
+    sections = []
     for doc_filename, outline_data in all_outlines_data.items():
         if doc_filename not in parsed_docs:
             continue
@@ -218,16 +262,6 @@ def analyze_persona_job(parsed_docs, persona, task, challenge_info, all_outlines
         document_text_pages = parsed_docs[doc_filename]
         all_doc_headings = outline_data.get('outline', [])
 
-        filename_keyword_boost = 0
-        searchable_filename_title_str = (Path(doc_filename).stem.replace("_", " ") + " " + outline_data.get('title', '')).lower()
-        filename_words = set(searchable_filename_title_str.split())
-        if not simple_keywords.isdisjoint(filename_words):
-            filename_keyword_boost += 0.15
-        phrase_words_set = set(word for phrase in phrase_keywords for word in phrase.lower().split())
-        if not phrase_words_set.isdisjoint(filename_words):
-            filename_keyword_boost += 0.05
-        filename_keyword_boost = min(filename_keyword_boost, 0.2)
-
         for i, current_heading_entry in enumerate(all_doc_headings):
             current_heading_text = current_heading_entry.get('text', '')
             current_page_num = current_heading_entry.get('page', 0) + 1
@@ -268,28 +302,204 @@ def analyze_persona_job(parsed_docs, persona, task, challenge_info, all_outlines
             full_section_text = "\n".join(full_section_text_parts).strip()
             if len(full_section_text.split()) < 10: continue
             
-            # Add the section and its context to a list instead of processing now
-            sections_to_process.append({
+            sections.append({
                 'doc_filename': doc_filename,
                 'full_section_text': full_section_text,
                 'current_heading_text': current_heading_text,
                 'current_page_num': current_page_num,
-                'level': current_heading_entry.get('level', 'H3'),
-                'filename_keyword_boost': filename_keyword_boost
+                'level': current_heading_entry.get('level', 'H3')
             })
+    return sections
+
+
+def compute_filename_keyword_boost(doc_filename, title, phrase_keywords, simple_keywords):
+    """
+    Boost for documents whose filename or title shares words with the keywords.
+    """
+    filename_keyword_boost = 0
+    searchable_filename_title_str = (Path(doc_filename).stem.replace("_", " ") + " " + title).lower()
+    filename_words = set(searchable_filename_title_str.split())
+    if not simple_keywords.isdisjoint(filename_words):
+        filename_keyword_boost += 0.15
+    phrase_words_set = set(word for phrase in phrase_keywords for word in phrase.lower().split())
+    if not phrase_words_set.isdisjoint(filename_words):
+        filename_keyword_boost += 0.05
+    return min(filename_keyword_boost, 0.2)
+
+
+def encode_sections(texts, budget=None, chunk_size=64):
+    """
+    Encodes section texts in one batch, or chunk by chunk against the encoding budget.
+    When the deadline hits, returns the embeddings of the texts encoded so far (always at least one chunk).
+    """
+    if budget is None:
+        # This one call replaces the hundreds or thousands of calls inside the loop
+        return embed(texts, show_progress_bar=True)
+
+    budget.start("encoding")
+    chunks = []
+    for start in range(0, len(texts), chunk_size):
+        if chunks and budget.expired("encoding"):
+            budget.degrade("encoding", f"ranked on {start} of {len(texts)} section encodings")
+            break
+        chunks.append(embed(texts[start:start + chunk_size]))
+    return torch.cat(chunks)
+
+
+# --- Document-Level Index (coarse-to-fine retrieval) ---
+
+def build_document_index(sections, all_outlines_data, budget=None):
+    """
+    Precomputes one embedding per document: its filename, title and outline headings, combined
+    with the mean of its section embeddings. Built once at ingestion, so each query only
+    compares against documents before any section is scored.
+    The section embeddings are kept, with 'embedding_rows' mapping a `sections` position to its row,
+    and reused when the selected sections are scored.
+    With a LatencyBudget, sections are encoded against the encoding budget, round-robin over documents
+    so every document keeps some coverage; sections left unencoded are pooled and scored without.
+    """
+    doc_filenames = list(all_outlines_data.keys())
+    if not doc_filenames:
+        return {'documents': [], 'embeddings': None, 'section_embeddings': None, 'embedding_rows': {}}
+
+    outline_texts = []
+    for doc_filename in doc_filenames:
+        outline_data = all_outlines_data[doc_filename]
+        headings = "; ".join(h.get('text', '') for h in outline_data.get('outline', []))
+        outline_texts.append(f"{Path(doc_filename).stem.replace('_', ' ')}. {outline_data.get('title', '')}. {headings}")
+    outline_embeddings = torch.nn.functional.normalize(embed(outline_texts), dim=-1)
+
+    section_rows = defaultdict(list)
+    position_in_doc = []
+    for row, section in enumerate(sections):
+        position_in_doc.append(len(section_rows[section['doc_filename']]))
+        section_rows[section['doc_filename']].append(row)
+    # Each document's first section, then each one's second, and so on
+    encode_order = sorted(range(len(sections)), key=lambda row: (position_in_doc[row], row))
+    section_embeddings = encode_sections([sections[row]['full_section_text'] for row in encode_order], budget=budget) if sections else None
+    embedding_rows = {row: embedding_row for embedding_row, row in enumerate(encode_order[:len(section_embeddings)])} if sections else {}
+    normalized_sections = torch.nn.functional.normalize(section_embeddings, dim=-1) if sections else None
+
+    doc_embeddings = []
+    for doc_row, doc_filename in enumerate(doc_filenames):
+        doc_embedding = outline_embeddings[doc_row]
+        encoded = [embedding_rows[row] for row in section_rows[doc_filename] if row in embedding_rows]
+        if encoded:
+            pooled = normalized_sections[encoded].mean(dim=0)
+            doc_embedding = doc_embedding + torch.nn.functional.normalize(pooled, dim=-1)
+        doc_embeddings.append(torch.nn.functional.normalize(doc_embedding, dim=-1))
+
+    return {
+        'documents': doc_filenames,
+        'embeddings': torch.stack(doc_embeddings),
+        'section_embeddings': section_embeddings,
+        'embedding_rows': embedding_rows
+    }
+
+
+def select_documents(document_index, query_context, all_outlines_data, top_m):
+    """
+    Coarse stage: ranks documents by query similarity plus the filename/title keyword boost
+    and returns the names of the top `top_m`.
+    """
+    if not document_index['documents']:
+        return set()
+    query_embed = embed(query_context['query'])
+    doc_scores = util.cos_sim(query_embed, document_index['embeddings'])[0]
+    for doc_row, doc_filename in enumerate(document_index['documents']):
+        doc_scores[doc_row] += compute_filename_keyword_boost(
+            doc_filename, all_outlines_data.get(doc_filename, {}).get('title', ''),
+            query_context['phrase_keywords'], query_context['simple_keywords']
+        )
+    top_rows = torch.topk(doc_scores, k=min(top_m, len(document_index['documents']))).indices.tolist()
+    return {document_index['documents'][row] for row in top_rows}
+
+
+# --- Main Analyzer Function ---
+
+def prepare_query(persona, task, challenge_info, budget=None):
+    """
+    Builds the query text and the tiered keywords once per request.
+    The result is plain data, so it can be shared with shard workers.
+    """
+    query = f"{persona['role']} needs to: {task['task']}"
+
+    # --- TIERED KEYWORD GENERATION ---
+    if budget:
+        budget.start("keywords")
+    phrase_keywords = extract_dynamic_keywords(persona, task, challenge_info, top_n=30, budget=budget)
+    simple_keywords = extract_keywords_simple(task['task'])
+    print(f"Analyzer: Phrase Keywords for context: {phrase_keywords}")
+    print(f"Analyzer: Simple Keywords for high-importance bonus: {simple_keywords}")
+
+    return {
+        'query': query,
+        'phrase_keywords': phrase_keywords,
+        'simple_keywords': simple_keywords
+    }
+
+
+def score_sections(sections, all_outlines_data, query_context, dedup_threshold=0.8, budget=None, section_embeddings=None,
+                   duplicate_groups=None, representative_texts=None):
+    """
+    Encodes the sections and returns every one scoring above the relevance floor.
+    Sections whose shingle similarity reaches `dedup_threshold` share one encoding.
+    Precomputed `section_embeddings`, aligned with `sections`, are reused instead of encoding.
+    A caller that clustered duplicates itself (e.g. a shard) passes `duplicate_groups`, one group id
+    per section, and `representative_texts`, the text to encode for each group id.
+    """
+    phrase_keywords = query_context['phrase_keywords']
+    simple_keywords = query_context['simple_keywords']
+    query_embed = embed(query_context['query'])
+
+    # --- NEW: Identify the job constraints from simple keywords ---
+    is_veg_request = 'vegetarian' in simple_keywords
+    is_gluten_free_request = 'gluten-free' in simple_keywords or 'gluten' in simple_keywords
+
+    filename_boosts = {
+        doc_filename: compute_filename_keyword_boost(doc_filename, outline_data.get('title', ''), phrase_keywords, simple_keywords)
+        for doc_filename, outline_data in all_outlines_data.items()
+    }
+    sections_to_process = [
+        {**section, 'filename_keyword_boost': filename_boosts.get(section['doc_filename'], 0)}
+        for section in sections
+    ]
 
     # --- STEP 2: Perform batch encoding on all collected texts ---
     if not sections_to_process:
         return []
 
     all_section_texts = [s['full_section_text'] for s in sections_to_process]
-    # This one call replaces the hundreds or thousands of calls inside the loop
-    all_section_embeddings = model.encode(all_section_texts, convert_to_tensor=True, show_progress_bar=True) 
+
+    # Near-duplicate sections share one encoding; every member gets the representative's embedding.
+    if duplicate_groups is None:
+        if dedup_threshold:
+            duplicate_groups = find_near_duplicates(all_section_texts, threshold=dedup_threshold)
+        else:
+            duplicate_groups = list(range(len(all_section_texts)))
+    if representative_texts is None:
+        representative_texts = all_section_texts
+    representatives = sorted(set(duplicate_groups))
+    if budget:
+        # Encode the sections with the most keyword hits first, so a partial encoding keeps the likeliest matches
+        keyword_words = simple_keywords | set(word for phrase in phrase_keywords for word in phrase.split())
+        representatives.sort(key=lambda idx: len(keyword_words & set(representative_texts[idx].lower().split())), reverse=True)
+    representative_rows = {section_idx: row for row, section_idx in enumerate(representatives)}
+    if len(representatives) < len(all_section_texts):
+        print(f"Analyzer: {len(all_section_texts) - len(representatives)} near-duplicate sections share an encoding.")
+
+    if section_embeddings is not None:
+        representative_embeddings = section_embeddings[representatives]
+    else:
+        representative_embeddings = encode_sections([representative_texts[i] for i in representatives], budget=budget)
 
     # --- STEP 3: Calculate scores using the pre-computed embeddings ---
     potential_sections = []
     for i, section_data in enumerate(sections_to_process):
-        para_embed = all_section_embeddings[i]
+        embedding_row = representative_rows[duplicate_groups[i]]
+        if embedding_row >= len(representative_embeddings):
+            continue # Not encoded before the encoding deadline
+        para_embed = representative_embeddings[embedding_row]
         final_title = section_data['current_heading_text']
         current_title_boost = boost_from_title(final_title, phrase_keywords, simple_keywords)
         
@@ -307,16 +517,27 @@ def analyze_persona_job(parsed_docs, persona, task, challenge_info, all_outlines
                 'section_title': final_title,
                 'text': section_data['full_section_text'],
                 'score': calculated_section_score,
-                'level': section_data['level']
+                'level': section_data['level'],
+                'duplicate_group': duplicate_groups[i],
+                'section_index': i
             })
 
-    # --- FINAL RANKING LOGIC (No changes here) ---
+    return potential_sections
+
+
+def select_top_sections(potential_sections, max_results, max_per_document=3):
+    """
+    Ranks scored sections, keeping at most `max_per_document` per document and
+    only the best-scoring member of each near-duplicate group.
+    """
+    # --- FINAL RANKING LOGIC ---
     all_sections = sorted(potential_sections, key=lambda x: x['score'], reverse=True)
     final_extracted_sections_for_output = []
     doc_count = defaultdict(int)
+    seen_duplicate_groups = set()
     current_rank = 1
     for section in all_sections:
-        if doc_count[section['document']] >= 3:
+        if doc_count[section['document']] >= max_per_document or section['duplicate_group'] in seen_duplicate_groups:
             continue
         final_extracted_sections_for_output.append({
             "document": section['document'],
@@ -324,11 +545,66 @@ def analyze_persona_job(parsed_docs, persona, task, challenge_info, all_outlines
             "importance_rank": current_rank,
             "page_number": section['page_number'],
             'score': section['score'],
-            'text': section['text']
+            'text': section['text'],
+            'duplicate_group': section['duplicate_group']
         })
         doc_count[section['document']] += 1
+        seen_duplicate_groups.add(section['duplicate_group'])
         current_rank += 1
         if len(final_extracted_sections_for_output) >= max_results:
             break
 
-    return final_extracted_sections_for_output
\ No newline at end of file
+    return final_extracted_sections_for_output
+
+
+def analyze_persona_job(parsed_docs, persona, task, challenge_info, all_outlines_data, max_results=8,
+                        sections=None, section_index=None, retrieval_mode="dense", bm25_top_n=200,
+                        dedup_threshold=0.8, budget=None, document_index=None, top_documents=5):
+    """
+    Analyzes documents by extracting full text between headings, correctly handles
+    sections that span multiple pages, and includes all scoring features.
+    (Optimized for batch processing)
+
+    In "hybrid" retrieval mode, BM25 over the keywords picks the top `bm25_top_n`
+    sections from `section_index` and only those are densely encoded and scored.
+    In "hierarchical" mode, `document_index` first picks the `top_documents` most relevant
+    documents and only their sections are scored, reusing the index's section embeddings
+    (the index must be built from the same `sections`).
+    Sections whose shingle similarity reaches `dedup_threshold` are encoded once and
+    collapsed to their best member in the results (pass None to disable).
+    With a LatencyBudget, KeyBERT and encoding fall back to cheaper paths when their time runs out.
+    """
+    query_context = prepare_query(persona, task, challenge_info, budget=budget)
+
+    # --- STEP 1: Collect all sections and their metadata first ---
+    if sections is None:
+        sections = segment_sections(parsed_docs, all_outlines_data)
+
+    section_embeddings = None
+    if retrieval_mode == "hybrid":
+        if section_index is None:
+            section_index = build_section_index(sections)
+        keywords = list(query_context['phrase_keywords']) + list(query_context['simple_keywords'])
+        candidate_ids = select_candidates(section_index, keywords, bm25_top_n)
+        print(f"Analyzer: BM25 prefilter kept {len(candidate_ids)} of {len(sections)} sections for dense scoring.")
+        sections = [sections[section_id] for section_id in candidate_ids]
+    elif retrieval_mode == "hierarchical":
+        if document_index is None:
+            document_index = build_document_index(sections, all_outlines_data, budget=budget)
+        selected_documents = select_documents(document_index, query_context, all_outlines_data, top_documents)
+        embedding_rows = document_index['embedding_rows']
+        selected_rows = [row for row, section in enumerate(sections) if section['doc_filename'] in selected_documents]
+        # Sections the index could not encode within its budget are skipped, as on the dense path
+        encoded_rows = [row for row in selected_rows if row in embedding_rows]
+        sections = [sections[row] for row in encoded_rows]
+        if encoded_rows:
+            section_embeddings = document_index['section_embeddings'][[embedding_rows[row] for row in encoded_rows]]
+        skipped = len(selected_rows) - len(encoded_rows)
+        print(f"Analyzer: Document stage kept {len(selected_documents)} document(s) with {len(sections)} section(s) for scoring"
+              + (f" ({skipped} not encoded within the budget)." if skipped else "."))
+
+    potential_sections = score_sections(
+        sections, all_outlines_data, query_context, dedup_threshold=dedup_threshold, budget=budget,
+        section_embeddings=section_embeddings
+    )
+    return select_top_sections(potential_sections, max_results)
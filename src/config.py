@@ -33,4 +33,57 @@ PDF_FOLDER = INPUT_DIR / "PDFs"
 
 print(f"✅ Input path set to: {INPUT_JSON_PATH}")
 print(f"✅ PDF path set to: {PDF_FOLDER}")
-print(f"✅ Output path set to: {OUTPUT_JSON_PATH}")
\ No newline at end of file
+print(f"✅ Output path set to: {OUTPUT_JSON_PATH}")
+
+# --- Retrieval settings (override with environment variables) ---
+# "dense" encodes every section; "hybrid" encodes only the BM25 top-N candidates;
+# "hierarchical" first picks the top documents from a document-level index and scores only their sections.
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense")
+BM25_TOP_N = int(os.getenv("BM25_TOP_N", "200"))
+HIERARCHICAL_TOP_DOCS = int(os.getenv("HIERARCHICAL_TOP_DOCS", "5"))
+# Sections at or above this estimated shingle similarity are encoded once and collapsed (0 disables).
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+
+# --- Latency-SLO mode: per-stage time budgets in seconds ---
+# When a stage runs out of time the pipeline falls back to a cheaper path and records it in the output metadata.
+LATENCY_SLO_MODE = os.getenv("LATENCY_SLO_MODE", "0") == "1"
+STAGE_BUDGETS = {
+    "extraction": float(os.getenv("EXTRACTION_BUDGET_S", "30")),
+    "keywords": float(os.getenv("KEYWORDS_BUDGET_S", "5")),
+    "encoding": float(os.getenv("ENCODING_BUDGET_S", "15")),
+    "summarization": float(os.getenv("SUMMARIZATION_BUDGET_S", "20")),
+}
+
+# --- Summarization ---
+# "fixed" keeps one 70-300 token output range for every text; "length_aware" buckets inputs by
+# token length and scales the output range to them. Unset beam/early-stopping options keep the model defaults.
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "fixed")
+SUMMARY_NUM_BEAMS = int(os.environ["SUMMARY_NUM_BEAMS"]) if os.getenv("SUMMARY_NUM_BEAMS") else None
+SUMMARY_EARLY_STOPPING = os.environ["SUMMARY_EARLY_STOPPING"] == "1" if os.getenv("SUMMARY_EARLY_STOPPING") else None
+# Optional cap on a length-aware batch's padded input tokens (batch size x longest input).
+SUMMARY_MAX_BATCH_TOKENS = int(os.environ["SUMMARY_MAX_BATCH_TOKENS"]) if os.getenv("SUMMARY_MAX_BATCH_TOKENS") else None
+
+# --- Shared inference scheduler ---
+# With INFERENCE_SCHEDULER=1, concurrent encoder and summarizer calls are merged into shared micro-batches.
+# A batch closes SCHEDULER_WINDOW_MS after its first request or at its item/token limit. Summarization
+# batches run as one forward pass, so they get their own, much smaller item limit.
+INFERENCE_SCHEDULER = os.getenv("INFERENCE_SCHEDULER", "0") == "1"
+SCHEDULER_WINDOW_MS = float(os.getenv("SCHEDULER_WINDOW_MS", "5"))
+SCHEDULER_MAX_BATCH = int(os.getenv("SCHEDULER_MAX_BATCH", "64"))
+SCHEDULER_MAX_TOKENS = int(os.getenv("SCHEDULER_MAX_TOKENS", "16384"))
+SUMMARY_SCHEDULER_MAX_BATCH = int(os.getenv("SUMMARY_SCHEDULER_MAX_BATCH", "8"))
+
+# --- Sharded execution ---
+# More than 1 partitions the PDFs across that many worker processes (see shard.py).
+NUM_SHARDS = int(os.getenv("NUM_SHARDS", "1"))
+
+# --- Page-range parallelism for large PDFs ---
+# PDFs with at least LARGE_PDF_PAGES pages are split into PAGE_RANGE_SIZE-page ranges extracted by PAGE_WORKERS processes.
+LARGE_PDF_PAGES = int(os.getenv("LARGE_PDF_PAGES", "200"))
+PAGE_RANGE_SIZE = int(os.getenv("PAGE_RANGE_SIZE", "100"))
+PAGE_WORKERS = int(os.getenv("PAGE_WORKERS", str(os.cpu_count() or 1)))
+
+# --- Progressive output ---
+# When enabled, results are also streamed to a JSON Lines file as they become available.
+PROGRESSIVE_OUTPUT = os.getenv("PROGRESSIVE_OUTPUT", "0") == "1"
+OUTPUT_JSONL_PATH = INPUT_DIR / "challenge1b_output.jsonl"
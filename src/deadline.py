@@ -0,0 +1,33 @@
+# src/deadline.py
+import time
+
+
+class LatencyBudget:
+    """
+    Tracks a time budget (in seconds) per pipeline stage and records the degradations
+    applied when a stage runs out of time. Stages without a budget never expire.
+    """
+
+    def __init__(self, stage_budgets):
+        self.stage_budgets = dict(stage_budgets)
+        self.degradations = []
+        self._deadlines = {}
+
+    def start(self, stage):
+        budget = self.stage_budgets.get(stage)
+        self._deadlines[stage] = time.monotonic() + budget if budget is not None else None
+
+    def remaining(self, stage):
+        deadline = self._deadlines.get(stage)
+        if deadline is None:
+            return None
+        return max(0.0, deadline - time.monotonic())
+
+    def expired(self, stage):
+        remaining = self.remaining(stage)
+        return remaining is not None and remaining <= 0
+
+    def degrade(self, stage, action):
+        print(f"⏱️ Stage '{stage}' exceeded its {self.stage_budgets.get(stage)}s budget: {action}")
+        self.degradations.append({"stage": stage, "action": action})
+
@@ -0,0 +1,78 @@
+# src/dedup.py
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from retrieval import tokenize
+
+# --- MinHash settings ---
+# 64 permutations split into 16 bands of 4 rows: pairs above ~0.7 Jaccard almost always share a band.
+NUM_PERMUTATIONS = 64
+NUM_BANDS = 16
+SHINGLE_SIZE = 5
+MERSENNE_PRIME = (1 << 31) - 1
+
+_rng = np.random.RandomState(42)
+_PERM_A = _rng.randint(1, MERSENNE_PRIME, size=NUM_PERMUTATIONS).astype(np.uint64)
+_PERM_B = _rng.randint(0, MERSENNE_PRIME, size=NUM_PERMUTATIONS).astype(np.uint64)
+
+
+def shingle_hashes(text, size=SHINGLE_SIZE):
+    """
+    Hashes the word `size`-grams of a text to 32-bit integers (crc32, so stable across processes).
+    """
+    tokens = tokenize(text)
+    if len(tokens) <= size:
+        shingles = {" ".join(tokens)}
+    else:
+        shingles = {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+    return np.array([zlib.crc32(s.encode("utf-8")) for s in shingles], dtype=np.uint64)
+
+
+def minhash_signature(text):
+    hashes = shingle_hashes(text)
+    # a * h + b stays below 2**63 because a < 2**31 and h < 2**32
+    permuted = (hashes[:, None] * _PERM_A + _PERM_B) % MERSENNE_PRIME
+    return permuted.min(axis=0)
+
+
+def find_near_duplicates(texts, threshold=0.8):
+    """
+    Clusters texts whose estimated Jaccard similarity of word shingles is at least `threshold`.
+    Returns, for every text, the index of its cluster representative (the first member).
+    """
+    if not texts:
+        return []
+    return cluster_signatures(np.vstack([minhash_signature(text) for text in texts]), threshold)
+
+
+def cluster_signatures(signatures, threshold=0.8):
+    """
+    Same as find_near_duplicates, over precomputed MinHash signatures (one row per text).
+    """
+    rows_per_band = NUM_PERMUTATIONS // NUM_BANDS
+
+    parent = list(range(len(signatures)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(NUM_BANDS):
+        buckets = defaultdict(list)
+        band_slice = signatures[:, band * rows_per_band:(band + 1) * rows_per_band]
+        for i, band_values in enumerate(band_slice):
+            buckets[band_values.tobytes()].append(i)
+        for members in buckets.values():
+            for position, j in enumerate(members):
+                for i in members[:position]:
+                    root_i, root_j = find(i), find(j)
+                    if root_i == root_j:
+                        continue
+                    if np.mean(signatures[i] == signatures[j]) >= threshold:
+                        parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    return [find(i) for i in range(len(signatures))]
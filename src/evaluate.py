@@ -0,0 +1,269 @@
+# src/evaluate.py
+"""
+Offline checks against the bundled collections.
+
+    python src/evaluate.py recall --top-n 25 50 100
+    python src/evaluate.py shards --num-shards 2 4
+    python src/evaluate.py summaries
+    python src/evaluate.py hierarchical --top-docs 2 3 5
+"""
+import argparse
+import json
+import time
+from collections import Counter
+from pathlib import Path
+
+from utils import load_input
+from process_pdfs import process_pdf_file
+from analyzer import analyze_persona_job, segment_sections, build_document_index, prepare_query, select_documents
+from retrieval import build_section_index, tokenize
+from shard import run_sharded
+from summarization import summarize_fixed, summarize_length_aware
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_COLLECTIONS = ["Collection_1", "Collection_2", "Collection_3"]
+
+
+# --- Helpers ---
+
+def load_collection(collection_dir):
+    """
+    Loads a collection folder and processes its PDFs. Returns (input_data, parsed_docs, all_outlines_data).
+    """
+    input_data = load_input(collection_dir / "challenge1b_input.json")
+    all_processed_data = {}
+    for pdf_file in sorted((collection_dir / "PDFs").glob("*.pdf")):
+        result_for_pdf = process_pdf_file(pdf_file)
+        if result_for_pdf:
+            all_processed_data[pdf_file.name] = result_for_pdf
+    parsed_docs = {filename: data['parsed_text'] for filename, data in all_processed_data.items() if 'parsed_text' in data}
+    return input_data, parsed_docs, all_processed_data
+
+
+def run_analysis(collection, **kwargs):
+    input_data, parsed_docs, all_outlines_data = collection
+    return analyze_persona_job(
+        parsed_docs,
+        input_data["persona"],
+        input_data["job_to_be_done"],
+        input_data["challenge_info"],
+        all_outlines_data,
+        max_results=10,
+        **kwargs
+    )
+
+
+def section_key(section):
+    return (section['document'], section['page_number'], section['section_title'])
+
+
+def recall_at_k(reference, candidate):
+    """
+    Fraction of the reference sections that also appear in the candidate results.
+    """
+    reference_keys = {section_key(s) for s in reference}
+    if not reference_keys:
+        return 1.0
+    return len(reference_keys & {section_key(s) for s in candidate}) / len(reference_keys)
+
+
+def rouge_n(candidate, reference, n=1):
+    """
+    ROUGE-N F1 over lowercase word n-grams.
+    """
+    candidate_tokens, reference_tokens = tokenize(candidate), tokenize(reference)
+    candidate_ngrams = Counter(tuple(candidate_tokens[i:i + n]) for i in range(len(candidate_tokens) - n + 1))
+    reference_ngrams = Counter(tuple(reference_tokens[i:i + n]) for i in range(len(reference_tokens) - n + 1))
+    overlap = sum((candidate_ngrams & reference_ngrams).values())
+    if not overlap:
+        return 0.0
+    precision = overlap / sum(candidate_ngrams.values())
+    recall = overlap / sum(reference_ngrams.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def rouge_l(candidate, reference):
+    """
+    ROUGE-L F1 from the longest common subsequence of words.
+    """
+    candidate_tokens, reference_tokens = tokenize(candidate), tokenize(reference)
+    if not candidate_tokens or not reference_tokens:
+        return 0.0
+    previous = [0] * (len(reference_tokens) + 1)
+    for candidate_token in candidate_tokens:
+        current = [0]
+        for j, reference_token in enumerate(reference_tokens):
+            current.append(previous[j] + 1 if candidate_token == reference_token else max(previous[j + 1], current[j]))
+        previous = current
+    lcs = previous[-1]
+    if not lcs:
+        return 0.0
+    precision = lcs / len(candidate_tokens)
+    recall = lcs / len(reference_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+# --- Checks ---
+
+def evaluate_bm25_recall(collection_names, top_ns):
+    """
+    Compares the hybrid (BM25 prefilter) results with the full dense path for each top-N.
+    """
+    for name in collection_names:
+        collection = load_collection(BASE_DIR / name)
+        sections = segment_sections(collection[1], collection[2])
+        section_index = build_section_index(sections)
+        dense_results = run_analysis(collection, sections=sections)
+        for top_n in top_ns:
+            hybrid_results = run_analysis(
+                collection, sections=sections, section_index=section_index,
+                retrieval_mode="hybrid", bm25_top_n=top_n
+            )
+            recall = recall_at_k(dense_results, hybrid_results)
+            print(f"{name}: {len(sections)} sections, BM25 top-{top_n} -> recall@{len(dense_results)} = {recall:.2f}")
+
+
+def evaluate_hierarchical_recall(collection_names, top_docs_values):
+    """
+    Compares hierarchical (document-first) retrieval with exhaustive section scoring for each top-M,
+    along with the sections each query scores and its wall time. The document index is built once per
+    collection and its section embeddings are reused, so hierarchical queries encode no sections.
+    """
+    for name in collection_names:
+        collection = load_collection(BASE_DIR / name)
+        input_data, _, all_outlines_data = collection
+        sections = segment_sections(collection[1], all_outlines_data)
+
+        start_time = time.perf_counter()
+        document_index = build_document_index(sections, all_outlines_data)
+        index_seconds = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        exhaustive_results = run_analysis(collection, sections=sections)
+        exhaustive_seconds = time.perf_counter() - start_time
+        print(f"{name}: {len(all_outlines_data)} documents, {len(sections)} sections; index built in {index_seconds:.1f}s, "
+              f"exhaustive query encodes and scores {len(sections)} sections in {exhaustive_seconds:.1f}s")
+
+        query_context = prepare_query(input_data["persona"], input_data["job_to_be_done"], input_data["challenge_info"])
+        for top_docs in top_docs_values:
+            selected_documents = select_documents(document_index, query_context, all_outlines_data, top_docs)
+            scored = sum(1 for section in sections if section['doc_filename'] in selected_documents)
+            start_time = time.perf_counter()
+            hierarchical_results = run_analysis(
+                collection, sections=sections, document_index=document_index,
+                retrieval_mode="hierarchical", top_documents=top_docs
+            )
+            seconds = time.perf_counter() - start_time
+            recall = recall_at_k(exhaustive_results, hierarchical_results)
+            print(f"  top-{top_docs} documents: scores {scored} of {len(sections)} sections (0 encoded) in {seconds:.1f}s "
+                  f"-> recall@{len(exhaustive_results)} = {recall:.2f}")
+
+
+def evaluate_sharded_match(collection_names, shard_counts):
+    """
+    Checks that the sharded coordinator, with local subprocess workers, returns the same sections as one process.
+    """
+    for name in collection_names:
+        collection_dir = BASE_DIR / name
+        collection = load_collection(collection_dir)
+        input_data = collection[0]
+        single_results = run_analysis(collection)
+        for num_shards in shard_counts:
+            sharded_results = run_sharded(
+                sorted((collection_dir / "PDFs").glob("*.pdf")),
+                input_data["persona"], input_data["job_to_be_done"], input_data["challenge_info"],
+                num_shards, max_results=10
+            )
+            matches = [section_key(s) for s in single_results] == [section_key(s) for s in sharded_results]
+            print(f"{name}: {num_shards} shards -> {'identical' if matches else 'DIFFERENT'} ranking "
+                  f"(recall@{len(single_results)} = {recall_at_k(single_results, sharded_results):.2f})")
+
+
+def load_summary_pairs(collection_names):
+    """
+    Pairs each reference summary in output_provided.json with the segmented section it most likely came from
+    (same document and page, highest word overlap). Returns (source_texts, reference_summaries).
+    """
+    from ranker import clean_final_text # Importing ranker loads the summarization model
+    source_texts, references = [], []
+    for name in collection_names:
+        collection_dir = BASE_DIR / name
+        _, parsed_docs, all_outlines_data = load_collection(collection_dir)
+        sections = segment_sections(parsed_docs, all_outlines_data)
+        with open(collection_dir / "output_provided.json", encoding="utf-8") as f:
+            provided = json.load(f)
+        for item in provided["subsection_analysis"]:
+            page_sections = [
+                s for s in sections
+                if s['doc_filename'] == item['document'] and s['current_page_num'] == item['page_number']
+            ]
+            if not page_sections:
+                continue
+            reference_words = set(tokenize(item['refined_text']))
+            best = max(page_sections, key=lambda s: len(reference_words & set(tokenize(s['full_section_text']))))
+            cleaned = clean_final_text(best['full_section_text'])
+            # Same threshold as refine_subsection_batch: shorter texts are never summarized
+            if len(cleaned.split()) >= 40:
+                source_texts.append(cleaned)
+                references.append(item['refined_text'])
+    return source_texts, references
+
+
+def benchmark_summarization(collection_names, batch_size, max_batch_tokens=None):
+    """
+    Compares throughput and ROUGE against the provided summaries for the current fixed settings
+    and the length-aware engine with several decode settings.
+    """
+    from ranker import summarizer # Only this check needs the summarization model
+    source_texts, references = load_summary_pairs(collection_names)
+    print(f"Benchmarking on {len(source_texts)} section(s) with reference summaries.")
+    if not source_texts:
+        return
+    summarizer(source_texts[:1], max_length=60, min_length=10, truncation=True) # Warm-up, excluded from timings
+
+    configs = [
+        ("current: fixed 70-300, model decode", summarize_fixed, {}),
+        ("length-aware, model decode", summarize_length_aware, {"max_batch_tokens": max_batch_tokens}),
+        ("length-aware, greedy", summarize_length_aware, {"num_beams": 1, "max_batch_tokens": max_batch_tokens}),
+        ("length-aware, 2 beams + early stop", summarize_length_aware,
+         {"num_beams": 2, "early_stopping": True, "max_batch_tokens": max_batch_tokens}),
+    ]
+    print(f"{'configuration':<38} {'s':>7} {'in tok/s':>9} {'out tok/s':>10} {'R-1':>6} {'R-2':>6} {'R-L':>6}")
+    for label, summarize, options in configs:
+        summaries, stats = summarize(summarizer, source_texts, batch_size=batch_size, **options)
+        scores = [(rouge_n(s, r, 1), rouge_n(s, r, 2), rouge_l(s, r)) for s, r in zip(summaries, references)]
+        r1, r2, rl = (sum(column) / len(scores) for column in zip(*scores))
+        print(f"{label:<38} {stats['seconds']:>7.1f} {stats['input_tokens_per_s']:>9.0f} "
+              f"{stats['output_tokens_per_s']:>10.1f} {r1:>6.3f} {r2:>6.3f} {rl:>6.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline checks against the bundled collections.")
+    parser.add_argument("--collections", nargs="+", default=DEFAULT_COLLECTIONS)
+    subparsers = parser.add_subparsers(dest="check", required=True)
+
+    recall_parser = subparsers.add_parser("recall", help="Recall of hybrid retrieval against the full dense path.")
+    recall_parser.add_argument("--top-n", type=int, nargs="+", default=[25, 50, 100, 200])
+
+    shards_parser = subparsers.add_parser("shards", help="Sharded coordinator output against a single process.")
+    shards_parser.add_argument("--num-shards", type=int, nargs="+", default=[2, 4])
+
+    summaries_parser = subparsers.add_parser("summaries", help="Summarization throughput and ROUGE by configuration.")
+    summaries_parser.add_argument("--batch-size", type=int, default=4)
+    summaries_parser.add_argument("--max-batch-tokens", type=int, default=None)
+
+    hierarchical_parser = subparsers.add_parser("hierarchical", help="Recall of hierarchical retrieval against exhaustive scoring.")
+    hierarchical_parser.add_argument("--top-docs", type=int, nargs="+", default=[2, 3, 5])
+
+    args = parser.parse_args()
+    if args.check == "recall":
+        evaluate_bm25_recall(args.collections, args.top_n)
+    elif args.check == "shards":
+        evaluate_sharded_match(args.collections, args.num_shards)
+    elif args.check == "summaries":
+        benchmark_summarization(args.collections, args.batch_size, args.max_batch_tokens)
+    elif args.check == "hierarchical":
+        evaluate_hierarchical_recall(args.collections, args.top_docs)
+
+
+if __name__ == "__main__":
+    main()
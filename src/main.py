@@ -3,41 +3,27 @@ import pprint
 import os
 from pathlib import Path
 # Local module imports for the processing pipeline
-from config import INPUT_JSON_PATH, OUTPUT_JSON_PATH, PDF_FOLDER
-from utils import load_input, generate_output_json
-from analyzer import analyze_persona_job
+from config import INPUT_JSON_PATH, OUTPUT_JSON_PATH, PDF_FOLDER, RETRIEVAL_MODE, BM25_TOP_N, NEAR_DUPLICATE_THRESHOLD
+from config import LATENCY_SLO_MODE, HIERARCHICAL_TOP_DOCS, STAGE_BUDGETS, NUM_SHARDS, PROGRESSIVE_OUTPUT, OUTPUT_JSONL_PATH
+from deadline import LatencyBudget
+from utils import load_input, generate_output_json, ProgressiveOutputWriter
+from analyzer import analyze_persona_job, segment_sections, build_document_index, encoder_scheduler
+from retrieval import build_section_index
 from process_pdfs import process_pdfs # We no longer need parser.py
-from ranker import rank_sections
+from ranker import rank_sections, summary_scheduler
+from shard import run_sharded
 
 
-def main():
+def run_single_process(persona, task, challenge_info, budget=None):
     """
-    Main function to run the entire PDF analysis and ranking pipeline.
+    Runs Stages 1-3 in this process. Returns the matched sections, or None if no PDF could be processed.
     """
-    print("--- Starting the Document Analysis Pipeline ---")
-
-    # Step 1: Load input data (persona, job, etc.) from the input JSON file
-    print(f"Loading input data from: {INPUT_JSON_PATH}")
-    try:
-        input_data = load_input(INPUT_JSON_PATH)
-        persona = input_data["persona"]
-        task = input_data["job_to_be_done"]
-        challenge_info = input_data["challenge_info"]
-        print("✅ Input data loaded successfully.")
-    except FileNotFoundError:
-        print(f"❌ ERROR: Input file not found at {INPUT_JSON_PATH}. Please ensure the file exists.")
-        return
-    except KeyError as e:
-        print(f"❌ ERROR: Missing expected key {e} in {INPUT_JSON_PATH}.")
-        return
-
-
     # Step 2: Process all PDFs to extract titles, outlines, and full text in a SINGLE PASS.
     print("\n--- Stage 1: Processing PDFs (Single Pass) ---")
-    all_processed_data = process_pdfs() # This now contains titles, outlines, and parsed_text
+    all_processed_data = process_pdfs(budget=budget) # This now contains titles, outlines, and parsed_text
     if not all_processed_data:
         print("❌ ERROR: No PDF data was processed. Please check your PDF folder and configuration.")
-        return
+        return None
     print(f"✅ Successfully processed {len(all_processed_data)} documents in a single pass.")
 
 
@@ -51,7 +37,13 @@ def main():
 
     # The 'all_outlines_data' is the same rich dictionary, as it contains the 'outline' and 'title' for each file.
     all_outlines_data = all_processed_data
-    print("✅ Data prepared for analyzer.")
+
+    # Segment sections once and build the index the retrieval mode needs:
+    # section terms for the BM25 prefilter, or one embedding per document for hierarchical retrieval.
+    sections = segment_sections(parsed_docs, all_outlines_data)
+    section_index = build_section_index(sections) if RETRIEVAL_MODE == "hybrid" else None
+    document_index = build_document_index(sections, all_outlines_data, budget=budget) if RETRIEVAL_MODE == "hierarchical" else None
+    print(f"✅ Data prepared for analyzer ({len(sections)} sections, retrieval mode: {RETRIEVAL_MODE}).")
 
 
     # Step 4: Analyze the documents to find sections relevant to the persona and task.
@@ -62,16 +54,92 @@ def main():
         task,
         challenge_info,
         all_outlines_data, # Pass the full structure
-        max_results=10
+        max_results=10,
+        sections=sections,
+        section_index=section_index,
+        retrieval_mode=RETRIEVAL_MODE,
+        bm25_top_n=BM25_TOP_N,
+        dedup_threshold=NEAR_DUPLICATE_THRESHOLD,
+        budget=budget,
+        document_index=document_index,
+        top_documents=HIERARCHICAL_TOP_DOCS
     )
     print(f"✅ Analysis complete. Found {len(matched_sections)} potentially relevant sections.")
+    return matched_sections
+
+
+def main():
+    """
+    Main function to run the entire PDF analysis and ranking pipeline.
+    """
+    print("--- Starting the Document Analysis Pipeline ---")
+
+    # Step 1: Load input data (persona, job, etc.) from the input JSON file
+    print(f"Loading input data from: {INPUT_JSON_PATH}")
+    try:
+        input_data = load_input(INPUT_JSON_PATH)
+        persona = input_data["persona"]
+        task = input_data["job_to_be_done"]
+        challenge_info = input_data["challenge_info"]
+        print("✅ Input data loaded successfully.")
+    except FileNotFoundError:
+        print(f"❌ ERROR: Input file not found at {INPUT_JSON_PATH}. Please ensure the file exists.")
+        return
+    except KeyError as e:
+        print(f"❌ ERROR: Missing expected key {e} in {INPUT_JSON_PATH}.")
+        return
+
+    # In latency-SLO mode every stage gets a time budget and degrades instead of overrunning it.
+    budget = LatencyBudget(STAGE_BUDGETS) if LATENCY_SLO_MODE else None
+    if budget:
+        print(f"⏱️ Latency-SLO mode enabled with stage budgets: {STAGE_BUDGETS}")
+
+
+    # Steps 2-4: Extract, segment and score, either in this process or across shard workers.
+    if NUM_SHARDS > 1:
+        print(f"\n--- Stages 1-3: Sharded Processing and Analysis ({NUM_SHARDS} shards) ---")
+        # Shards run the dense path at full fidelity; the retrieval mode and the extraction, keyword
+        # and encoding budgets only apply in single-process mode.
+        if RETRIEVAL_MODE != "dense":
+            print(f"⚠️ WARNING: RETRIEVAL_MODE={RETRIEVAL_MODE} is ignored with NUM_SHARDS > 1; shards score every section.")
+        if budget:
+            print("⚠️ WARNING: With NUM_SHARDS > 1 only the summarization budget applies; "
+                  "extraction, keyword and encoding budgets are ignored.")
+        matched_sections = run_sharded(
+            sorted(PDF_FOLDER.glob("*.pdf")),
+            persona,
+            task,
+            challenge_info,
+            NUM_SHARDS,
+            max_results=10,
+            dedup_threshold=NEAR_DUPLICATE_THRESHOLD
+        )
+        print(f"✅ Sharded analysis complete. Found {len(matched_sections)} potentially relevant sections.")
+    else:
+        matched_sections = run_single_process(persona, task, challenge_info, budget=budget)
+        if matched_sections is None:
+            return
 
 
     # Step 5: Rank the matched sections and generate the final output JSON.
     print("\n--- Stage 4: Ranking Sections and Generating Output ---")
-    ranked_sections, subsections = rank_sections(matched_sections, persona, task)
-    generate_output_json(input_data, ranked_sections, subsections, OUTPUT_JSON_PATH)
+    # In progressive mode the ranking and each summary are streamed before the final file is written.
+    stream = ProgressiveOutputWriter(input_data, OUTPUT_JSONL_PATH) if PROGRESSIVE_OUTPUT else None
+    if stream:
+        print(f"Streaming results as they complete to: {OUTPUT_JSONL_PATH}")
+    ranked_sections, subsections = rank_sections(
+        matched_sections, persona, task, budget=budget,
+        on_sections=stream.write_sections if stream else None,
+        on_subsection=stream.write_subsection if stream else None
+    )
+    degradations = budget.degradations if budget else None
+    generate_output_json(input_data, ranked_sections, subsections, OUTPUT_JSON_PATH, degradations=degradations)
+    if stream:
+        stream.close(OUTPUT_JSON_PATH)
     print(f"✅ Final output generated at: {OUTPUT_JSON_PATH}")
+    for name, scheduler in (("Encoder", encoder_scheduler), ("Summarizer", summary_scheduler)):
+        if scheduler:
+            print(f"{name} scheduler metrics: {scheduler.metrics()}")
     print("\n--- Document Analysis Pipeline Finished ---")
 
 
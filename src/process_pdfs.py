@@ -8,14 +8,18 @@ import time
 import sys
 from pathlib import Path
 from collections import OrderedDict, Counter
+from concurrent.futures import ProcessPoolExecutor
 import pprint
 import fitz  # PyMuPDF
+import numpy as np
 
 try:
     from config import PDF_FOLDER as CONFIG_PDF_FOLDER
+    from config import LARGE_PDF_PAGES, PAGE_RANGE_SIZE, PAGE_WORKERS
 except ImportError:
     print("⚠️ WARNING: Could not find config.py. Defaulting to current directory for PDFs.")
     CONFIG_PDF_FOLDER = '.'
+    LARGE_PDF_PAGES, PAGE_RANGE_SIZE, PAGE_WORKERS = 200, 100, os.cpu_count() or 1
 
 try:
     nlp = spacy.load("en_core_web_sm")
@@ -28,46 +32,67 @@ def clean_text(text):
     return re.sub(r'\s+', ' ', text.strip())
 
 
-def extract_headings_with_pymupdf(doc_fitz):
+def collect_font_statistics(doc_fitz, page_numbers=None):
     """
-    Extracts headings from an already open fitz (PyMuPDF) document.
+    Walks every span of an open fitz document (or of the given 0-based pages) once.
+    Returns the (size, font) histogram, per page the size of each line keyed by its cleaned text,
+    and the (text, page, size) of every line whose text could be a PyMuPDF heading.
     """
-    headings = []
     font_counts = Counter()
-    for page in doc_fitz:
+    line_sizes = {}
+    sized_lines = []
+    pages = doc_fitz if page_numbers is None else (doc_fitz[page_number] for page_number in page_numbers)
+    for page in pages:
+        page_sizes = line_sizes.setdefault(page.number, {})
         blocks = page.get_text("dict", flags=11)["blocks"]
         for b in blocks:
             if "lines" in b:
                 for l in b["lines"]:
                     for s in l["spans"]:
                         font_counts[(round(s["size"]), s["font"])] += 1
+                    if l["spans"]:
+                        font_size = round(l["spans"][0]["size"])
+                        line_text = "".join([s["text"] for s in l["spans"]]).strip()
+                        page_sizes[clean_text(line_text)] = font_size
+                        if (len(line_text.split()) < 15 and
+                            not line_text.endswith(('.', ':')) and
+                            re.search('[a-zA-Z]', line_text) and
+                            len(line_text) > 3):
+                            sized_lines.append((line_text, page.number, font_size))
+    return font_counts, line_sizes, sized_lines
+
+
+def body_font_size(font_counts):
+    """
+    Returns the rounded size of the most common (size, font) style, i.e. the body text size.
+    """
+    if not font_counts:
+        return None
+    return font_counts.most_common(1)[0][0][0]
+
+
+def extract_headings_with_pymupdf(doc_fitz, font_counts=None, sized_lines=None):
+    """
+    Extracts headings from an already open fitz (PyMuPDF) document.
+    Precomputed font statistics can be passed in to avoid walking the spans again.
+    """
+    headings = []
+    if font_counts is None or sized_lines is None:
+        font_counts, _, sized_lines = collect_font_statistics(doc_fitz)
     
     if not font_counts:
         return headings
 
-    most_common_style = font_counts.most_common(1)[0][0]
-    most_common_size = most_common_style[0]
+    most_common_size = body_font_size(font_counts)
     
     unique_sizes = sorted(list(set(round(s[0]) for s in font_counts.keys())), reverse=True)
     heading_sizes = {size for size in unique_sizes if size > most_common_size + 1}
 
     temp_headings = []
-    for page in doc_fitz:
-        blocks = page.get_text("dict", flags=11)["blocks"]
-        for b in blocks:
-            if "lines" in b:
-                for l in b["lines"]:
-                    if l["spans"]:
-                        span = l["spans"][0]
-                        font_size = round(span["size"])
-                        if font_size in heading_sizes:
-                            line_text = "".join([s["text"] for s in l["spans"]]).strip()
-                            if (len(line_text.split()) < 15 and
-                                not line_text.endswith(('.', ':')) and
-                                re.search('[a-zA-Z]', line_text) and
-                                len(line_text) > 3):
-                                if not temp_headings or temp_headings[-1][0] != line_text:
-                                    temp_headings.append((line_text, page.number))
+    for line_text, page_number, font_size in sized_lines:
+        if font_size in heading_sizes:
+            if not temp_headings or temp_headings[-1][0] != line_text:
+                temp_headings.append((line_text, page_number))
     i = 0
     while i < len(temp_headings):
         current_heading, page_number = temp_headings[i]
@@ -97,47 +122,147 @@ def extract_title_from_first_page(doc_plumber):
             return line.strip()
     return ""
 
-def is_form_field(text):
-    form_patterns = [r"^\d+\.\s*[A-Za-z]+", r"^\(?\d+\)?\s*[A-Za-z]+", r"^[A-Za-z]+\s*:\s*$", r"^(Name|Date|Address|Phone|Email|Signature|Relationship)\s*:?$", r"^(S\.No|Sl\.No)", r"PAY|NPA|SI"]
-    return any(re.search(pattern, text, re.IGNORECASE) for pattern in form_patterns)
-
-def is_table_header(text, page_text):
-    table_patterns = [r"S\.No", r"Name\s+Age\s+Relationship", r"\w+\s+\w+\s+\w+\s+\w+"]
-    if text and page_text.count(text) > 1:
-        return True
-    return any(re.search(pattern, text, re.IGNORECASE) for pattern in table_patterns)
-
-def is_heading(text, page_text, prev_text=None, next_text=None, line_index=0, is_poster=False):
-    if not text or len(text) > 150: return False
-    if text.strip().lower().startswith("o "): return False
-    if re.match(r"^\d{1,2}[/-]\d{1,2}[/-]\d{2,4}", text): return False
-    if re.match(r"^[•\-–*]", text): return False
-    if re.match(r"^(page|p\.?)\s*\d+$", text.lower()): return False
+# --- Heading Feature Table ---
+# Rules are compiled once and evaluated per candidate line while building the table.
+FORM_FIELD_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r"^\d+\.\s*[A-Za-z]+", r"^\(?\d+\)?\s*[A-Za-z]+", r"^[A-Za-z]+\s*:\s*$",
+    r"^(Name|Date|Address|Phone|Email|Signature|Relationship)\s*:?$", r"^(S\.No|Sl\.No)", r"PAY|NPA|SI"
+)]
+TABLE_HEADER_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r"S\.No", r"Name\s+Age\s+Relationship", r"\w+\s+\w+\s+\w+\s+\w+"
+)]
+NUMBERED_HEADING_RE = re.compile(r"^\d+(\.\d+){0,2}\s+[A-Z]")
+NUMBERING_RE = re.compile(r"^(\d+(\.\d+){0,2})\s+")
+DATE_RE = re.compile(r"^\d{1,2}[/-]\d{1,2}[/-]\d{2,4}")
+BULLET_RE = re.compile(r"^[•\-–*]")
+PAGE_LABEL_RE = re.compile(r"^(page|p\.?)\s*\d+$")
+
+
+def numbering_depth(text):
+    """
+    Returns 0 for "1 ", 1 for "1.2 ", 2 for "1.2.3 " prefixes and -1 when the text is not numbered.
+    """
+    match = NUMBERING_RE.match(text)
+    return match.group(1).count('.') if match else -1
+
+
+def count_verbs(texts):
+    """
+    Counts the verbs of each text in one batched spaCy pass (-1 for every text when spaCy is unavailable).
+    Only the tagger is needed, so the parser, NER and lemmatizer are skipped.
+    """
+    if not nlp:
+        return [-1] * len(texts)
+    return [
+        sum(1 for token in doc if token.pos_ == "VERB")
+        for doc in nlp.pipe(texts, disable=["parser", "ner", "lemmatizer"])
+    ]
+
+
+def build_heading_features(candidates, line_sizes=None, body_size=None):
+    """
+    Builds one feature row per candidate line and returns the table as a dict of numpy columns.
+    Each candidate is a dict with 'text', 'page', 'line_index', 'next_text' and 'repeat_count',
+    and optionally a precomputed 'verb_count'. Without one, 'verb_count' is -1 until tag_verbs() fills it.
+    """
+    line_sizes = line_sizes or {}
+    texts = [c['text'] for c in candidates]
+    n = len(texts)
+
+    font_size_ratio = np.ones(n)
+    if body_size:
+        for row, c in enumerate(candidates):
+            size = line_sizes.get(c['page'], {}).get(c['text'])
+            if size:
+                font_size_ratio[row] = size / body_size
+
+    verb_count = np.array([c.get("verb_count", -1) for c in candidates], dtype=int)
+
+    return {
+        'char_length': np.array([len(t) for t in texts]),
+        'word_count': np.array([len(t.split()) for t in texts]),
+        'is_upper': np.array([t.isupper() for t in texts], dtype=bool),
+        'is_title': np.array([t.istitle() for t in texts], dtype=bool),
+        'is_numbered_heading': np.array([bool(NUMBERED_HEADING_RE.match(t)) for t in texts], dtype=bool),
+        'numbering_depth': np.array([numbering_depth(t) for t in texts]),
+        'line_index': np.array([c['line_index'] for c in candidates]),
+        'verb_count': verb_count,
+        'ends_with_punct': np.array([t.rstrip().endswith(('.', ':', ';')) for t in texts], dtype=bool),
+        'next_is_distinct': np.array([bool(c['next_text']) and c['text'] not in c['next_text'] for c in candidates], dtype=bool),
+        'repeat_count': np.array([c['repeat_count'] for c in candidates]),
+        'font_size_ratio': font_size_ratio,
+        'is_bullet_like': np.array([
+            t.strip().lower().startswith("o ") or bool(BULLET_RE.match(t)) for t in texts
+        ], dtype=bool),
+        'is_date': np.array([bool(DATE_RE.match(t)) for t in texts], dtype=bool),
+        'is_page_label': np.array([bool(PAGE_LABEL_RE.match(t.lower())) for t in texts], dtype=bool),
+        'is_form_field': np.array([any(p.search(t) for p in FORM_FIELD_PATTERNS) for t in texts], dtype=bool),
+        'matches_table_pattern': np.array([any(p.search(t) for p in TABLE_HEADER_PATTERNS) for t in texts], dtype=bool),
+    }
+
+
+def reject_heading_candidates(features, is_poster=False):
+    """
+    Returns the mask of rows ruled out by the cheap text rules. It does not depend on verb counts.
+    """
+    f = features
+    rejected = (f['char_length'] > 150) | f['is_bullet_like'] | f['is_date'] | f['is_page_label']
     if not is_poster:
-        if is_form_field(text) or is_table_header(text, page_text): return False
-        if len(text.split()) > 12: return False
+        is_table_header = (f['repeat_count'] > 1) | f['matches_table_pattern']
+        rejected |= f['is_form_field'] | is_table_header | (f['word_count'] > 12)
     else:
-        if not (text.isupper() or len(text.split()) <= 5): return False
-    score = 0
-    if re.match(r"^\d+(\.\d+){0,2}\s+[A-Z]", text): score += 3
-    if text.isupper(): score += 2
-    elif text.istitle(): score += 1
-    if line_index < 3: score += 1
-    if nlp:
-        doc = nlp(text)
-        verb_count = sum(1 for token in doc if token.pos_ == "VERB")
-        if verb_count == 0: score += 1
-        elif verb_count == 1: score += 0.5
-    if not text.rstrip().endswith(('.', ':', ';')): score += 0.5
-    if prev_text and text not in prev_text: score += 0.5
-    if next_text and text not in next_text: score += 0.5
-    threshold = 3 if not is_poster else 2
-    return score >= threshold
+        rejected |= ~(f['is_upper'] | (f['word_count'] <= 5))
+    return rejected
+
+
+def tag_verbs(features, texts, is_poster=False):
+    """
+    Fills the 'verb_count' column for the rows that survive the cheap rejections;
+    rejected rows keep -1, since their score is never used.
+    """
+    rows = np.flatnonzero(~reject_heading_candidates(features, is_poster))
+    features['verb_count'][rows] = count_verbs([texts[row] for row in rows])
+
+
+def score_heading_candidates(features, is_poster=False):
+    """
+    Scores every row of the feature table in one pass.
+    Returns (scores, rejected). The previous-line bonus depends on which lines were kept,
+    so it is added by the caller while walking the rows in order.
+    """
+    f = features
+    rejected = reject_heading_candidates(features, is_poster)
+
+    scores = (
+        3.0 * f['is_numbered_heading']
+        + 2.0 * f['is_upper']
+        + 1.0 * (f['is_title'] & ~f['is_upper'])
+        + 1.0 * (f['line_index'] < 3)
+        + 1.0 * (f['verb_count'] == 0)
+        + 0.5 * (f['verb_count'] == 1)
+        + 0.5 * ~f['ends_with_punct']
+        + 0.5 * f['next_is_distinct']
+    )
+    # font_size_ratio is carried in the table but not weighted, so decisions match the text rules
+    return scores, rejected
+
+
+def assign_heading_levels(features):
+    """
+    Assigns H1/H2/H3 to every row from numbering depth, casing and word count.
+    """
+    depth = features['numbering_depth']
+    word_count = features['word_count']
+    return np.select(
+        [depth == 0, depth == 1, depth >= 2, features['is_upper'], word_count <= 3, word_count <= 6],
+        ["H1", "H2", "H3", "H1", "H1", "H2"],
+        default="H3"
+    )
+
 
 def determine_heading_level(text, prev_headings=None):
-    match = re.match(r"^(\d+(\.\d+){0,2})\s+", text)
-    if match:
-        depth = match.group(1).count('.')
+    depth = numbering_depth(text)
+    if depth != -1:
         if depth == 0: return "H1"
         elif depth == 1: return "H2"
         else: return "H3"
@@ -157,45 +282,76 @@ def is_poster_or_flyer(doc_plumber):
     caps_lines_ratio = sum(1 for line in lines if line.isupper()) / len(lines)
     return short_lines_ratio > 0.6 or caps_lines_ratio > 0.3
 
-def extract_headings_from_pdf(doc_plumber, doc_fitz):
+def extract_heading_candidates(doc_plumber, skip_tables=False, page_numbers=None, page_texts=None):
     """
-    Extracts headings using already open pdfplumber and fitz documents.
+    Collects every non-table text line of the document (or of the given 0-based pages),
+    with the context the feature table needs. Repeat counts come from one Counter per page.
+    Already extracted page texts, keyed by 1-based page number, can be passed in.
+    With skip_tables, table cells are not filtered out.
     """
-    headings = []
-    seen_headings = set()
-    generic_headings_to_remove = ['introduction', 'overview', 'summary', 'preface', 'background']
-    
-    is_poster = is_poster_or_flyer(doc_plumber)
-    
-    for page_idx, page in enumerate(doc_plumber.pages):
-        text = page.extract_text()
+    candidates = []
+    if page_numbers is None:
+        page_numbers = range(len(doc_plumber.pages))
+    for page_idx in page_numbers:
+        page = doc_plumber.pages[page_idx]
+        text = page_texts[page.page_number] if page_texts is not None else page.extract_text()
         if not text: continue
         
         lines = text.split("\n")
-        prev_line = ""
-        tables = page.extract_tables()
+        clean_lines = [clean_text(line) for line in lines]
+        line_counts = Counter(clean_lines)
+        tables = page.extract_tables() if not skip_tables else []
         table_texts = set(clean_text(cell) for table in tables for row in table if row for cell in row if cell)
         
-        for i, line in enumerate(lines):
-            clean_line = clean_text(line)
+        for i, clean_line in enumerate(clean_lines):
             if not clean_line or clean_line in table_texts: continue
+            candidates.append({
+                "text": clean_line,
+                "page": page_idx,
+                "line_index": i,
+                "next_text": clean_lines[i+1] if i+1 < len(clean_lines) else "",
+                "repeat_count": line_counts[clean_line]
+            })
+    return candidates
+
+
+def classify_headings(candidates, font_counts, line_sizes, sized_lines, is_poster=False):
+    """
+    Turns heading candidates and font statistics (of the whole document) into the outline.
+    """
+    headings = []
+    seen_headings = set()
+    generic_headings_to_remove = ['introduction', 'overview', 'summary', 'preface', 'background']
+
+    features = build_heading_features(candidates, line_sizes, body_font_size(font_counts))
+    if not all("verb_count" in c for c in candidates):
+        tag_verbs(features, [c["text"] for c in candidates], is_poster=is_poster)
+    scores, rejected = score_heading_candidates(features, is_poster=is_poster)
+    levels = assign_heading_levels(features)
+    threshold = 3 if not is_poster else 2
+
+    prev_line = ""
+    prev_page = None
+    for row, candidate in enumerate(candidates):
+        clean_line = candidate["text"]
+        if candidate["page"] != prev_page:
+            prev_line = ""
+            prev_page = candidate["page"]
+        
+        score = scores[row] + (0.5 if prev_line and clean_line not in prev_line else 0)
+        if not rejected[row] and score >= threshold:
+            if clean_line.lower() in generic_headings_to_remove or clean_line in seen_headings:
+                continue
             
-            next_line = clean_text(lines[i+1]) if i+1 < len(lines) else ""
-            
-            if is_heading(clean_line, text, prev_text=prev_line, next_text=next_line, line_index=i, is_poster=is_poster):
-                if clean_line.lower() in generic_headings_to_remove or clean_line in seen_headings:
-                    continue
-                
-                level = determine_heading_level(clean_line, headings)
-                headings.append({"level": level, "text": clean_line, "page": page_idx})
-                seen_headings.add(clean_line)
-            prev_line = clean_line
+            headings.append({"level": str(levels[row]), "text": clean_line, "page": candidate["page"]})
+            seen_headings.add(clean_line)
+        prev_line = clean_line
             
     if is_poster and len(headings) > 3:
         headings.sort(key=lambda h: (0 if h["level"] == "H1" else (1 if h["level"] == "H2" else 2), len(h["text"])))
         headings = headings[:1]
     
-    pymupdf_headings = extract_headings_with_pymupdf(doc_fitz)
+    pymupdf_headings = extract_headings_with_pymupdf(None, font_counts=font_counts, sized_lines=sized_lines)
     for heading_text, page_num in pymupdf_headings:
         if heading_text not in seen_headings:
             level = determine_heading_level(heading_text)
@@ -204,24 +360,99 @@ def extract_headings_from_pdf(doc_plumber, doc_fitz):
 
     return headings
 
-def process_pdf_file(pdf_path):
+
+def extract_headings_from_pdf(doc_plumber, doc_fitz, skip_tables=False, page_texts=None):
+    """
+    Extracts headings using already open pdfplumber and fitz documents.
+    """
+    is_poster = is_poster_or_flyer(doc_plumber)
+    font_counts, line_sizes, sized_lines = collect_font_statistics(doc_fitz)
+    candidates = extract_heading_candidates(doc_plumber, skip_tables=skip_tables, page_texts=page_texts)
+    return classify_headings(candidates, font_counts, line_sizes, sized_lines, is_poster=is_poster)
+
+
+# --- Page-Range Parallelism for Large PDFs ---
+
+def extract_page_range(pdf_path, start, end, is_poster=False, skip_tables=False):
+    """
+    Worker: extracts page texts, heading candidates and font statistics for 0-based pages [start, end).
+    """
+    page_numbers = range(start, end)
+    with fitz.open(pdf_path) as doc_fitz, pdfplumber.open(pdf_path) as doc_plumber:
+        page_texts = {doc_plumber.pages[i].page_number: doc_plumber.pages[i].extract_text() for i in page_numbers}
+        candidates = extract_heading_candidates(doc_plumber, skip_tables=skip_tables, page_numbers=page_numbers, page_texts=page_texts)
+        font_counts, line_sizes, sized_lines = collect_font_statistics(doc_fitz, page_numbers)
+    # Verb tagging is the costliest feature, so it runs here rather than in the parent.
+    # The rejection rules only use per-line features, so the worker can skip rejected lines itself.
+    features = build_heading_features(candidates)
+    tag_verbs(features, [c["text"] for c in candidates], is_poster=is_poster)
+    for candidate, verb_count in zip(candidates, features['verb_count'].tolist()):
+        candidate["verb_count"] = verb_count
+    return {
+        "page_texts": page_texts,
+        "candidates": candidates,
+        "font_counts": font_counts,
+        "line_sizes": line_sizes,
+        "sized_lines": sized_lines
+    }
+
+
+def extract_pages_in_parallel(pdf_path, num_pages, is_poster, skip_tables=False):
+    """
+    Splits a large PDF into page ranges, extracts them in worker processes and merges the results in page order.
+    The font histogram is combined over all ranges before headings are classified, so the outline matches a serial run.
+    """
+    ranges = [(start, min(start + PAGE_RANGE_SIZE, num_pages)) for start in range(0, num_pages, PAGE_RANGE_SIZE)]
+    with ProcessPoolExecutor(max_workers=min(PAGE_WORKERS, len(ranges))) as executor:
+        range_results = list(executor.map(
+            extract_page_range,
+            [pdf_path] * len(ranges), [start for start, _ in ranges], [end for _, end in ranges],
+            [is_poster] * len(ranges), [skip_tables] * len(ranges)
+        ))
+
+    parsed_text = {}
+    candidates = []
+    font_counts = Counter()
+    line_sizes = {}
+    sized_lines = []
+    for result in range_results:
+        parsed_text.update(result["page_texts"])
+        candidates.extend(result["candidates"])
+        font_counts.update(result["font_counts"])
+        line_sizes.update(result["line_sizes"])
+        sized_lines.extend(result["sized_lines"])
+
+    headings = classify_headings(candidates, font_counts, line_sizes, sized_lines, is_poster=is_poster)
+    return parsed_text, headings
+
+
+def process_pdf_file(pdf_path, skip_tables=False):
     """
     Process a single PDF file by opening it only once.
+    PDFs of at least LARGE_PDF_PAGES pages are split into page ranges extracted in parallel.
+    skip_tables is the cheap path used when the extraction budget has run out.
     """
     doc_fitz = None
     try:
-        # Open file once with each required library
-        doc_fitz = fitz.open(pdf_path)
         with pdfplumber.open(pdf_path) as doc_plumber:
             
             # 1. Get Title
             title = extract_title_from_first_page(doc_plumber)
-            
-            # 2. Get Parsed Text
-            parsed_text = {page.page_number: page.extract_text() for page in doc_plumber.pages}
-            
-            # 3. Get Headings (pass opened docs)
-            headings = extract_headings_from_pdf(doc_plumber, doc_fitz)
+            num_pages = len(doc_plumber.pages)
+
+            if PAGE_WORKERS > 1 and num_pages >= LARGE_PDF_PAGES:
+                # 2-3. Get Parsed Text and Headings from page ranges in worker processes
+                is_poster = is_poster_or_flyer(doc_plumber)
+                parsed_text, headings = extract_pages_in_parallel(pdf_path, num_pages, is_poster, skip_tables=skip_tables)
+            else:
+                # Open file once with each required library
+                doc_fitz = fitz.open(pdf_path)
+
+                # 2. Get Parsed Text
+                parsed_text = {page.page_number: page.extract_text() for page in doc_plumber.pages}
+                
+                # 3. Get Headings (pass opened docs and the text extracted above)
+                headings = extract_headings_from_pdf(doc_plumber, doc_fitz, skip_tables=skip_tables, page_texts=parsed_text)
         
         # Special case from original code
         if pdf_path.name.lower() == "file01.pdf":
@@ -241,9 +472,10 @@ def process_pdf_file(pdf_path):
         if doc_fitz:
             doc_fitz.close()
 
-def process_pdfs():
+def process_pdfs(budget=None):
     """
     Process all PDF files in the input directory efficiently.
+    With a LatencyBudget, files processed after the extraction deadline skip table extraction.
     """
     print("\n--- Starting PDF Processing ---")
     input_dir = Path(CONFIG_PDF_FOLDER)
@@ -251,14 +483,21 @@ def process_pdfs():
         print(f"❌ ERROR: Input directory does not exist: {input_dir.resolve()}")
         return {}
     
-    pdf_files = list(input_dir.glob("*.pdf"))
+    # Sorted, so section order (and tie-breaking) is the same as in sharded runs
+    pdf_files = sorted(input_dir.glob("*.pdf"))
     if not pdf_files:
         print(f"⚠️ WARNING: No PDF files were found in {input_dir.resolve()}")
         return {}
     
     all_data_in_memory = {}
+    skip_tables = False
+    if budget:
+        budget.start("extraction")
     for pdf_file in pdf_files:
-        result_for_pdf = process_pdf_file(pdf_file)
+        if budget and not skip_tables and budget.expired("extraction"):
+            skip_tables = True
+            budget.degrade("extraction", "skipped table extraction for the remaining documents")
+        result_for_pdf = process_pdf_file(pdf_file, skip_tables=skip_tables)
         if result_for_pdf:
             all_data_in_memory[pdf_file.name] = result_for_pdf
 
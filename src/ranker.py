@@ -3,6 +3,10 @@ from transformers import pipeline
 import logging
 import os
 import re
+from config import SUMMARY_MODE, SUMMARY_NUM_BEAMS, SUMMARY_EARLY_STOPPING, SUMMARY_MAX_BATCH_TOKENS
+from summarization import summarize_fixed, summarize_length_aware
+from config import INFERENCE_SCHEDULER, SUMMARY_SCHEDULER_MAX_BATCH
+from scheduler import ScheduledPipeline
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -11,6 +15,12 @@ logging.basicConfig(level=logging.INFO)
 model_name = os.getenv("SUMMARIZER_MODEL", "sshleifer/distilbart-cnn-6-6")
 summarizer = pipeline("summarization", model=model_name)
 
+# With INFERENCE_SCHEDULER=1, summarization calls from concurrent analyses are merged into shared batches
+summary_backend = ScheduledPipeline(
+    summarizer, name="summarizer", max_batch_size=SUMMARY_SCHEDULER_MAX_BATCH
+) if INFERENCE_SCHEDULER else summarizer
+summary_scheduler = summary_backend.scheduler if INFERENCE_SCHEDULER else None
+
 
 def clean_final_text(text: str) -> str:
     """
@@ -37,9 +47,16 @@ def clean_final_text(text: str) -> str:
 
 # In src/ranker.py
 
-def rank_sections(matches, persona, task, max_total=6, max_per_document=2):
+def rank_sections(matches, persona, task, max_total=6, max_per_document=2, budget=None,
+                  on_sections=None, on_subsection=None):
+    """
+    Picks the final sections and summarizes their text.
+    For progressive output, on_sections(sections) is called once the ranking is ready and
+    on_subsection(index, entry) as each subsection_analysis entry completes.
+    """
     sorted_matches = sorted(matches, key=lambda x: x['score'], reverse=True)
     doc_count = defaultdict(int)
+    seen_duplicate_groups = set()
     output_sections = []
     subsections_to_refine = [] # Collect data for refinement
     rank = 1
@@ -54,6 +71,13 @@ def rank_sections(matches, persona, task, max_total=6, max_per_document=2):
         if doc_count[doc] >= max_per_document:
             continue
 
+        # Near-duplicates of an already selected section would only repeat its summary
+        duplicate_group = section.get('duplicate_group')
+        if duplicate_group is not None:
+            if duplicate_group in seen_duplicate_groups:
+                continue
+            seen_duplicate_groups.add(duplicate_group)
+
         output_sections.append({
             "document": doc,
             "section_title": section['section_title'],
@@ -74,15 +98,21 @@ def rank_sections(matches, persona, task, max_total=6, max_per_document=2):
         if len(output_sections) >= max_total:
             break
             
+    if on_sections:
+        on_sections(output_sections)
+
     # Batch refine the subsections
-    refined_subsections = refine_subsection_batch(subsections_to_refine)
+    refined_subsections = refine_subsection_batch(subsections_to_refine, budget=budget, on_subsection=on_subsection)
 
     return output_sections, refined_subsections
 
 
-def refine_subsection_batch(subsections_data):
+def refine_subsection_batch(subsections_data, budget=None, batch_size=4, on_subsection=None, max_batch_tokens=SUMMARY_MAX_BATCH_TOKENS):
     """
     Summarizes a batch of subsection texts.
+    In length-aware mode, `max_batch_tokens` also caps each batch's padded input size.
+    With a LatencyBudget, texts not summarized before the deadline keep their cleaned text.
+    on_subsection(index, entry) is called for each entry as soon as its text is final.
     """
     if not subsections_data:
         return []
@@ -91,42 +121,54 @@ def refine_subsection_batch(subsections_data):
     for item in subsections_data:
         item['cleaned_text'] = clean_final_text(item['text'])
 
+    final_subsections = [None] * len(subsections_data)
+
+    def finalize(index, refined_text):
+        item = subsections_data[index]
+        final_subsections[index] = {
+            "document": item['document'],
+            "refined_text": refined_text,
+            "page_number": item['page_number']
+        }
+        if on_subsection:
+            on_subsection(index, final_subsections[index])
+
     # Separate short texts from those needing summarization
-    texts_to_summarize = [
-        item['cleaned_text'] for item in subsections_data if len(item['cleaned_text'].split()) >= 40
-    ]
-    
-    summaries = []
+    long_indices = []
+    for index, item in enumerate(subsections_data):
+        if len(item['cleaned_text'].split()) < 40:
+            finalize(index, item['cleaned_text']) # Use cleaned text if it was too short
+        else:
+            long_indices.append(index)
+    texts_to_summarize = [subsections_data[index]['cleaned_text'] for index in long_indices]
+
     if texts_to_summarize:
+        # In progressive mode, each summary is finalized (and emitted) as its batch completes
+        on_summary = None
+        if on_subsection:
+            on_summary = lambda text_index, summary: finalize(long_indices[text_index], summary.strip())
         try:
-            # Summarize all long texts in one batch
-            summaries = summarizer(
-                texts_to_summarize, max_length=300, min_length=70, do_sample=False, truncation=True, batch_size=4
+            if SUMMARY_MODE == "length_aware":
+                summary_texts, stats = summarize_length_aware(
+                    summary_backend, texts_to_summarize, batch_size=batch_size, max_batch_tokens=max_batch_tokens,
+                    num_beams=SUMMARY_NUM_BEAMS, early_stopping=SUMMARY_EARLY_STOPPING, budget=budget, on_summary=on_summary
+                )
+            else:
+                summary_texts, stats = summarize_fixed(summary_backend, texts_to_summarize, batch_size=batch_size, budget=budget, on_summary=on_summary)
+            logging.info(
+                f"Summarized {stats['texts']} texts in {stats['batches']} batches: "
+                f"{stats['input_tokens_per_s']:.0f} input tokens/s, {stats['output_tokens_per_s']:.1f} output tokens/s"
             )
+            for text_index, summary in enumerate(summary_texts):
+                if summary is not None and final_subsections[long_indices[text_index]] is None:
+                    finalize(long_indices[text_index], summary.strip())
         except Exception as e:
             logging.warning(f"Batch summarization failed. Error: {e}")
-            # Fallback to returning the cleaned text for all items if batch fails
-            summaries = [{'summary_text': text} for text in texts_to_summarize]
 
-    summary_iter = iter(summaries)
-    final_subsections = []
-    for item in subsections_data:
-        refined_text = ""
-        if len(item['cleaned_text'].split()) < 40:
-            refined_text = item['cleaned_text'] # Use cleaned text if it was too short
-        else:
-            try:
-                # Pop the next available summary
-                refined_text = next(summary_iter)['summary_text'].strip()
-            except StopIteration:
-                 # Fallback in case of an issue
-                refined_text = item['cleaned_text']
-
-        final_subsections.append({
-            "document": item['document'],
-            "refined_text": refined_text,
-            "page_number": item['page_number']
-        })
+    # Fallback to the cleaned text for anything not summarized (deadline or failure)
+    for index in long_indices:
+        if final_subsections[index] is None:
+            finalize(index, subsections_data[index]['cleaned_text'])
         
     return final_subsections
 
@@ -0,0 +1,65 @@
+# src/retrieval.py
+import math
+import re
+from collections import Counter, defaultdict
+
+# Keeps hyphenated words like "gluten-free" together, matching the simple keywords
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+
+# Standard Okapi BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def build_section_index(sections):
+    """
+    Builds an inverted index (term -> {section_id: term frequency}) over segmented sections.
+    Section ids are positions in the `sections` list.
+    """
+    postings = defaultdict(dict)
+    section_lengths = []
+    for section_id, section in enumerate(sections):
+        term_counts = Counter(tokenize(section['full_section_text']))
+        for term, tf in term_counts.items():
+            postings[term][section_id] = tf
+        section_lengths.append(sum(term_counts.values()))
+
+    return {
+        'postings': dict(postings),
+        'section_lengths': section_lengths,
+        'avg_length': (sum(section_lengths) / len(section_lengths)) if section_lengths else 0.0,
+        'num_sections': len(section_lengths)
+    }
+
+
+def bm25_scores(index, query_terms):
+    """
+    Scores every section that contains at least one query term. Returns {section_id: score}.
+    """
+    scores = defaultdict(float)
+    num_sections = index['num_sections']
+    avg_length = index['avg_length'] or 1.0
+    for term in set(query_terms):
+        term_postings = index['postings'].get(term)
+        if not term_postings:
+            continue
+        df = len(term_postings)
+        idf = math.log(1 + (num_sections - df + 0.5) / (df + 0.5))
+        for section_id, tf in term_postings.items():
+            length_norm = 1 - BM25_B + BM25_B * index['section_lengths'][section_id] / avg_length
+            scores[section_id] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * length_norm)
+    return scores
+
+
+def select_candidates(index, keywords, top_n):
+    """
+    Returns the ids of the top_n sections by BM25 over the keywords, in original section order.
+    """
+    query_terms = [term for keyword in keywords for term in tokenize(keyword)]
+    scores = bm25_scores(index, query_terms)
+    ranked = sorted(range(index['num_sections']), key=lambda section_id: scores.get(section_id, 0.0), reverse=True)
+    return sorted(ranked[:top_n])
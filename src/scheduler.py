@@ -0,0 +1,137 @@
+# src/scheduler.py
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+
+from config import SCHEDULER_WINDOW_MS, SCHEDULER_MAX_BATCH, SCHEDULER_MAX_TOKENS
+
+
+class MicroBatchScheduler:
+    """
+    Collects inference requests from concurrent callers and runs them as one shared batch.
+    A batch closes `max_wait_ms` after its first request, or earlier once it holds
+    `max_batch_size` items or `max_batch_tokens` approximate (whitespace) tokens. A request that would
+    overflow those limits waits for the next batch; only a single request larger than the limits runs alone.
+    Requests with different call options are batched separately. Results come back through futures.
+    """
+
+    def __init__(self, run_batch, max_batch_size=SCHEDULER_MAX_BATCH, max_wait_ms=SCHEDULER_WINDOW_MS,
+                 max_batch_tokens=SCHEDULER_MAX_TOKENS, name="inference"):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_tokens = max_batch_tokens
+        self._queue = queue.Queue()
+        self._held = None # A request that did not fit into the previous batch
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "batches": 0, "failed_batches": 0, "items": 0, "largest_batch": 0, "max_queue_depth": 0}
+        self._thread = threading.Thread(target=self._run, name=f"{name}-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, items, **options):
+        """
+        Queues a list of inputs and returns a Future for the list of their outputs.
+        """
+        future = Future()
+        self._queue.put((list(items), options, future))
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._queue.qsize())
+        return future
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["mean_batch_size"] = stats["items"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    def _collect(self):
+        """
+        Blocks for the first request, then gathers more until the window closes or a limit is reached.
+        """
+        if self._held is not None:
+            requests, self._held = [self._held], None
+        else:
+            requests = [self._queue.get()]
+        num_items = len(requests[0][0])
+        num_tokens = sum(len(str(item).split()) for item in requests[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while num_items < self.max_batch_size and (not self.max_batch_tokens or num_tokens < self.max_batch_tokens):
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            request_tokens = sum(len(str(item).split()) for item in request[0])
+            if num_items + len(request[0]) > self.max_batch_size or (
+                    self.max_batch_tokens and num_tokens + request_tokens > self.max_batch_tokens):
+                self._held = request
+                break
+            requests.append(request)
+            num_items += len(request[0])
+            num_tokens += request_tokens
+        return requests
+
+    def _run(self):
+        while True:
+            groups = {}
+            for request in self._collect():
+                groups.setdefault(tuple(sorted(request[1].items())), []).append(request)
+            for group in groups.values():
+                self._run_group(group)
+
+    def _run_group(self, group):
+        # Requests cancelled while queued are dropped; the rest can no longer be cancelled
+        group = [request for request in group if request[2].set_running_or_notify_cancel()]
+        if not group:
+            return
+        items = [item for request_items, _, _ in group for item in request_items]
+        options = group[0][1]
+        try:
+            results = self.run_batch(items, **options)
+        except Exception as e:
+            with self._lock:
+                self._stats["failed_batches"] += 1
+            for _, _, future in group:
+                self._deliver(future.set_exception, e)
+            return
+
+        offset = 0
+        for request_items, _, future in group:
+            self._deliver(future.set_result, results[offset:offset + len(request_items)])
+            offset += len(request_items)
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["items"] += len(items)
+            self._stats["largest_batch"] = max(self._stats["largest_batch"], len(items))
+
+    @staticmethod
+    def _deliver(set_outcome, value):
+        """
+        Sets one future's outcome; a future in an unexpected state must not stop the scheduler thread.
+        """
+        try:
+            set_outcome(value)
+        except InvalidStateError:
+            pass
+
+
+class ScheduledPipeline:
+    """
+    Drop-in replacement for a Hugging Face pipeline call that routes requests through a shared scheduler.
+    The per-call batch_size is ignored: the scheduler's combined batch runs as one forward batch,
+    so its size is bounded by the scheduler's `max_batch_size`.
+    """
+
+    def __init__(self, pipe, **scheduler_options):
+        self.tokenizer = pipe.tokenizer
+        self.scheduler = MicroBatchScheduler(
+            lambda texts, **options: pipe(texts, batch_size=len(texts), **options), **scheduler_options
+        )
+
+    def __call__(self, texts, batch_size=None, **options):
+        return self.scheduler.submit(texts, **options).result()
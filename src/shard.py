@@ -0,0 +1,289 @@
+# src/shard.py
+"""
+Sharded execution: documents are partitioned across worker processes, each shard extracts,
+segments, encodes and scores its own documents. The coordinator merges the shards' candidates;
+rank_sections() then runs once on the merged result.
+
+The merged ranking matches a single process over the same PDFs (in the order given):
+  1. Each worker returns one MinHash signature per section. The coordinator numbers the sections
+     in single-process order and clusters near-duplicates over all of them, so groups can span shards.
+  2. Shards holding a representative whose members live elsewhere send its text, and every
+     shard scores each section with its representative's embedding, as one process would.
+  3. Workers page out candidates by descending score. The coordinator requests more pages until
+     every shard's unreturned candidates score below the global cut-off.
+
+A worker is a session that reads one JSON request per stdin line and prints each result as a
+tagged stdout line:
+
+    python src/shard.py worker
+
+Workers on other hosts can be reached by prefixing the command, e.g.
+worker_command=["ssh", "host2", "python", "/app/src/shard.py"], as long as the PDF paths
+are visible there.
+"""
+import json
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from process_pdfs import process_pdf_file
+from analyzer import prepare_query, segment_sections, score_sections, select_top_sections
+from dedup import minhash_signature, cluster_signatures
+
+RESULT_MARKER = "SHARD_RESULT "
+
+
+# --- Worker Side ---
+
+class ShardSession:
+    """
+    One shard's documents and sections, kept in memory across the coordinator's requests.
+    """
+
+    def __init__(self, pdf_paths):
+        all_processed_data = {}
+        for pdf_path in pdf_paths:
+            pdf_path = Path(pdf_path)
+            result_for_pdf = process_pdf_file(pdf_path)
+            if result_for_pdf:
+                all_processed_data[pdf_path.name] = result_for_pdf
+        parsed_docs = {filename: data['parsed_text'] for filename, data in all_processed_data.items() if 'parsed_text' in data}
+        self.all_outlines_data = all_processed_data
+        self.sections = segment_sections(parsed_docs, all_processed_data)
+        self.candidates = []
+
+    def describe(self, with_signatures):
+        """
+        Lists each section's document in segmentation order, with its MinHash signature when deduplicating.
+        """
+        return {
+            'documents': [section['doc_filename'] for section in self.sections],
+            'signatures': [minhash_signature(s['full_section_text']).tolist() for s in self.sections] if with_signatures else None
+        }
+
+    def texts(self, rows):
+        return [self.sections[row]['full_section_text'] for row in rows]
+
+    def score(self, query_context, section_ids, duplicate_groups, imported_texts):
+        """
+        Scores every section with the global duplicate groups; each group is encoded from its
+        representative's text, taken from this shard or from `imported_texts`.
+        """
+        representative_texts = {section_id: s['full_section_text'] for section_id, s in zip(section_ids, self.sections)}
+        representative_texts.update({section_id: text for section_id, text in imported_texts})
+        potential_sections = score_sections(
+            self.sections, self.all_outlines_data, query_context,
+            duplicate_groups=duplicate_groups, representative_texts=representative_texts
+        )
+        for candidate in potential_sections:
+            candidate['section_id'] = section_ids[candidate.pop('section_index')]
+        self.candidates = sorted(potential_sections, key=candidate_order)
+        return len(self.candidates)
+
+    def page(self, start, count):
+        return self.candidates[start:start + count]
+
+
+def worker_main():
+    session = None
+    for line in sys.stdin:
+        request = json.loads(line)
+        command = request['command']
+        if command == 'load':
+            session = ShardSession(request['pdf_paths'])
+            result = session.describe(request['with_signatures'])
+        elif command == 'texts':
+            result = session.texts(request['rows'])
+        elif command == 'score':
+            query_context = dict(request['query_context'])
+            query_context['phrase_keywords'] = set(query_context['phrase_keywords'])
+            query_context['simple_keywords'] = set(query_context['simple_keywords'])
+            result = session.score(query_context, request['section_ids'], request['duplicate_groups'], request['imported_texts'])
+        elif command == 'candidates':
+            result = session.page(request['start'], request['count'])
+        else:
+            raise ValueError(f"Unknown shard command: {command}")
+        # Library output also goes to stdout, so each result is tagged
+        print(RESULT_MARKER + json.dumps(result, ensure_ascii=False), flush=True)
+
+
+# --- Coordinator Side ---
+
+def candidate_order(candidate):
+    """
+    Descending score, ties in single-process section order (as the stable sort in select_top_sections).
+    """
+    return (-candidate['score'], candidate['section_id'])
+
+
+class ShardWorker:
+    """
+    Coordinator-side handle on one worker session (a local subprocess or a remote command).
+    """
+
+    def __init__(self, worker_command):
+        self.process = subprocess.Popen(
+            worker_command + ["worker"], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding="utf-8"
+        )
+
+    def request(self, command, **payload):
+        self.process.stdin.write(json.dumps({'command': command, **payload}) + "\n")
+        self.process.stdin.flush()
+        for line in self.process.stdout:
+            if line.startswith(RESULT_MARKER):
+                return json.loads(line[len(RESULT_MARKER):])
+        raise RuntimeError(f"Shard worker exited with code {self.process.wait()} without returning a result.")
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass # The worker already exited
+        self.process.wait()
+
+
+def partition_documents(pdf_files, num_shards):
+    """
+    Splits files into `num_shards` groups of similar total size (largest file first, onto the lightest shard).
+    """
+    shards = [[] for _ in range(num_shards)]
+    shard_sizes = [0] * num_shards
+    for pdf_file in sorted(pdf_files, key=lambda p: Path(p).stat().st_size, reverse=True):
+        lightest = shard_sizes.index(min(shard_sizes))
+        shards[lightest].append(str(pdf_file))
+        shard_sizes[lightest] += Path(pdf_file).stat().st_size
+    return [shard for shard in shards if shard]
+
+
+def assign_section_ids(shard_documents, document_order):
+    """
+    Numbers every shard's sections in single-process order: documents as ordered in `document_order`,
+    sections in segmentation order. Returns one list of section ids per shard.
+    """
+    positions = sorted(
+        (document_order[doc_filename], shard_id, row)
+        for shard_id, documents in enumerate(shard_documents)
+        for row, doc_filename in enumerate(documents)
+    )
+    section_ids = [[None] * len(documents) for documents in shard_documents]
+    for section_id, (_, shard_id, row) in enumerate(positions):
+        section_ids[shard_id][row] = section_id
+    return section_ids
+
+
+def merge_candidates(shard_candidates, shard_totals, max_results):
+    """
+    Selects the global top `max_results` from the candidates fetched so far. Returns the selection
+    and the shards whose unfetched candidates could still change it (they may score at or above the cut-off).
+    """
+    merged = sorted((c for candidates in shard_candidates for c in candidates), key=candidate_order)
+    selected = select_top_sections(merged, max_results)
+    incomplete = []
+    for shard_id, candidates in enumerate(shard_candidates):
+        if len(candidates) >= shard_totals[shard_id]:
+            continue
+        if len(selected) < max_results or candidates[-1]['score'] >= selected[-1]['score']:
+            incomplete.append(shard_id)
+    return selected, incomplete
+
+
+def run_sharded(pdf_files, persona, task, challenge_info, num_shards, max_results=10, dedup_threshold=0.8,
+                worker_command=None):
+    """
+    Coordinates a sharded analysis with one worker session per shard.
+    Keywords are generated once here and shared with every worker.
+    """
+    worker_command = worker_command or [sys.executable, str(Path(__file__).resolve())]
+    query_context = prepare_query(persona, task, challenge_info)
+    shareable_context = {
+        'query': query_context['query'],
+        'phrase_keywords': sorted(query_context['phrase_keywords']),
+        'simple_keywords': sorted(query_context['simple_keywords'])
+    }
+
+    shards = partition_documents(pdf_files, num_shards)
+    if not shards:
+        return []
+    print(f"Coordinator: Running {len(shards)} shard(s) over {len(pdf_files)} document(s).")
+    document_order = {Path(pdf_file).name: position for position, pdf_file in enumerate(pdf_files)}
+
+    workers = [ShardWorker(worker_command) for _ in shards]
+    try:
+        # One thread per worker keeps every shard's pipes drained while they run in parallel
+        with ThreadPoolExecutor(max_workers=len(workers)) as executor:
+            described = list(executor.map(
+                lambda worker, pdf_paths: worker.request('load', pdf_paths=pdf_paths, with_signatures=bool(dedup_threshold)),
+                workers, shards
+            ))
+            section_ids = assign_section_ids([d['documents'] for d in described], document_order)
+
+            # Cluster near-duplicates over every section, as the single-process path does
+            num_sections = sum(len(ids) for ids in section_ids)
+            if dedup_threshold and num_sections:
+                signatures = [None] * num_sections
+                for ids, d in zip(section_ids, described):
+                    for section_id, signature in zip(ids, d['signatures']):
+                        signatures[section_id] = signature
+                global_groups = cluster_signatures(np.array(signatures, dtype=np.uint64), threshold=dedup_threshold)
+            else:
+                global_groups = list(range(num_sections))
+            owners = {section_id: (shard_id, row) for shard_id, ids in enumerate(section_ids) for row, section_id in enumerate(ids)}
+
+            # Representatives whose members sit in other shards are encoded there from their text
+            exports = [set() for _ in workers]
+            imports = [set() for _ in workers]
+            for shard_id, ids in enumerate(section_ids):
+                for section_id in ids:
+                    owner_shard, owner_row = owners[global_groups[section_id]]
+                    if owner_shard != shard_id:
+                        exports[owner_shard].add(owner_row)
+                        imports[shard_id].add(global_groups[section_id])
+            exported = list(executor.map(
+                lambda worker, rows: dict(zip(rows, worker.request('texts', rows=rows))) if rows else {},
+                workers, [sorted(rows) for rows in exports]
+            ))
+            if any(imports):
+                print(f"Coordinator: {sum(len(i) for i in imports)} near-duplicate representative(s) span shards.")
+
+            def score_shard(shard_id):
+                imported_texts = [
+                    [section_id, exported[owners[section_id][0]][owners[section_id][1]]]
+                    for section_id in sorted(imports[shard_id])
+                ]
+                return workers[shard_id].request(
+                    'score', query_context=shareable_context, section_ids=section_ids[shard_id],
+                    duplicate_groups=[global_groups[section_id] for section_id in section_ids[shard_id]],
+                    imported_texts=imported_texts
+                )
+            shard_totals = list(executor.map(score_shard, range(len(workers))))
+
+            # Fetch candidates page by page until no shard can change the global top-k
+            shard_candidates = [[] for _ in workers]
+            page_sizes = [max_results] * len(workers)
+            pending = [shard_id for shard_id, total in enumerate(shard_totals) if total]
+            while True:
+                def fetch(shard_id):
+                    return workers[shard_id].request('candidates', start=len(shard_candidates[shard_id]), count=page_sizes[shard_id])
+                for shard_id, page in zip(pending, executor.map(fetch, pending)):
+                    shard_candidates[shard_id].extend(page)
+                    page_sizes[shard_id] *= 2
+                selected, pending = merge_candidates(shard_candidates, shard_totals, max_results)
+                if not pending:
+                    break
+    finally:
+        for worker in workers:
+            worker.close()
+
+    for shard_id, candidates in enumerate(shard_candidates):
+        print(f"Coordinator: Shard {shard_id} returned {len(candidates)} of {shard_totals[shard_id]} candidate(s).")
+    return selected
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "worker":
+        worker_main()
+    else:
+        print("Usage: python src/shard.py worker")
@@ -0,0 +1,145 @@
+# src/summarization.py
+import time
+
+# --- Output length scaling for the length-aware engine ---
+# Summaries get between MIN_RATIO and MAX_RATIO of the input tokens, capped by the legacy 70/300 settings.
+MIN_RATIO = 0.2
+MAX_RATIO = 0.6
+MIN_FLOOR = 16
+LEGACY_MIN_LENGTH = 70
+LEGACY_MAX_LENGTH = 300
+# A bucket closes when the next (longer) input is more than this many times its shortest input,
+# unless both get the same (capped) output bounds, so every text's bounds stay close to its own length.
+MAX_BUCKET_LENGTH_RATIO = 1.5
+
+
+def output_length_bounds(input_tokens):
+    """
+    Returns (min_length, max_length) of the summary for an input of `input_tokens` tokens.
+    """
+    max_length = int(min(LEGACY_MAX_LENGTH, max(2 * MIN_FLOOR, input_tokens * MAX_RATIO)))
+    min_length = int(min(LEGACY_MIN_LENGTH, max(MIN_FLOOR, input_tokens * MIN_RATIO), max_length - 1))
+    return min_length, max_length
+
+
+def count_tokens(tokenizer, texts):
+    max_tokens = tokenizer.model_max_length if tokenizer.model_max_length < 100_000 else 1024
+    return [len(ids) for ids in tokenizer(texts, truncation=True, max_length=max_tokens)["input_ids"]]
+
+
+def bucket_by_length(token_lengths, batch_size, max_batch_tokens=None, max_length_ratio=MAX_BUCKET_LENGTH_RATIO):
+    """
+    Groups text indices, sorted by token length, into batches of similar length.
+    A batch closes at `batch_size` texts, when its padded size would exceed `max_batch_tokens`,
+    or when the next text is more than `max_length_ratio` times the batch's shortest and gets different output bounds.
+    """
+    order = sorted(range(len(token_lengths)), key=lambda i: token_lengths[i])
+    batches = []
+    current = []
+    for i in order:
+        # Sorted ascending, so the new text sets the padded length of the batch
+        padded_tokens = (len(current) + 1) * token_lengths[i]
+        shortest = token_lengths[current[0]] if current else 0
+        too_long = (
+            token_lengths[i] > max_length_ratio * shortest
+            and output_length_bounds(token_lengths[i]) != output_length_bounds(shortest)
+        )
+        if current and (len(current) >= batch_size or (max_batch_tokens and padded_tokens > max_batch_tokens) or too_long):
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _throughput_stats(tokenizer, texts, summaries, elapsed, num_batches):
+    done = [i for i, summary in enumerate(summaries) if summary is not None]
+    input_tokens = sum(count_tokens(tokenizer, [texts[i] for i in done])) if done else 0
+    output_tokens = sum(count_tokens(tokenizer, [summaries[i] for i in done])) if done else 0
+    return {
+        "texts": len(done),
+        "batches": num_batches,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "seconds": elapsed,
+        "input_tokens_per_s": input_tokens / elapsed if elapsed else 0.0,
+        "output_tokens_per_s": output_tokens / elapsed if elapsed else 0.0
+    }
+
+
+def summarize_fixed(summarizer, texts, max_length=LEGACY_MAX_LENGTH, min_length=LEGACY_MIN_LENGTH, batch_size=4, budget=None,
+                    on_summary=None):
+    """
+    The original settings: one output length range for every input, batched in input order.
+    Returns (summaries, stats); texts left unsummarized at the budget deadline are None.
+    on_summary(index, summary) is called as each batch completes.
+    """
+    start_time = time.perf_counter()
+    summaries = [None] * len(texts)
+    if budget is None and on_summary is None:
+        results = summarizer(texts, max_length=max_length, min_length=min_length, do_sample=False, truncation=True, batch_size=batch_size)
+        summaries = [result['summary_text'] for result in results]
+        num_batches = (len(texts) + batch_size - 1) // batch_size
+    else:
+        if budget:
+            budget.start("summarization")
+        num_batches = 0
+        for start in range(0, len(texts), batch_size):
+            if budget and budget.expired("summarization"):
+                budget.degrade("summarization", f"returned cleaned text for {len(texts) - start} of {len(texts)} subsections")
+                break
+            results = summarizer(
+                texts[start:start + batch_size], max_length=max_length, min_length=min_length, do_sample=False, truncation=True, batch_size=batch_size
+            )
+            for index, result in enumerate(results, start=start):
+                summaries[index] = result['summary_text']
+                if on_summary:
+                    on_summary(index, summaries[index])
+            num_batches += 1
+    elapsed = time.perf_counter() - start_time
+    return summaries, _throughput_stats(summarizer.tokenizer, texts, summaries, elapsed, num_batches)
+
+
+def summarize_length_aware(summarizer, texts, batch_size=4, max_batch_tokens=None, num_beams=None, early_stopping=None, budget=None,
+                           on_summary=None):
+    """
+    Summarizes texts in batches of similar token length, with output lengths scaled to each batch's inputs.
+    num_beams=1 decodes greedily; None keeps the model's own beam and early-stopping settings.
+    Returns (summaries, stats) in input order; texts left unsummarized at the budget deadline are None.
+    on_summary(index, summary) is called as each batch completes.
+    """
+    start_time = time.perf_counter()
+    tokenizer = summarizer.tokenizer
+    token_lengths = count_tokens(tokenizer, texts)
+    batches = bucket_by_length(token_lengths, batch_size, max_batch_tokens)
+
+    decode_options = {}
+    if num_beams is not None:
+        decode_options["num_beams"] = num_beams
+    if early_stopping is not None:
+        decode_options["early_stopping"] = early_stopping
+
+    if budget:
+        budget.start("summarization")
+    summaries = [None] * len(texts)
+    num_batches = 0
+    for batch in batches:
+        if budget and budget.expired("summarization"):
+            remaining = sum(1 for summary in summaries if summary is None)
+            budget.degrade("summarization", f"returned cleaned text for {remaining} of {len(texts)} subsections")
+            break
+        # Bounds follow the shortest input, so no summary is forced longer than its text allows
+        min_length, max_length = output_length_bounds(min(token_lengths[i] for i in batch))
+        results = summarizer(
+            [texts[i] for i in batch], max_length=max_length, min_length=min_length,
+            do_sample=False, truncation=True, batch_size=len(batch), **decode_options
+        )
+        for i, result in zip(batch, results):
+            summaries[i] = result['summary_text']
+            if on_summary:
+                on_summary(i, summaries[i])
+        num_batches += 1
+
+    elapsed = time.perf_counter() - start_time
+    return summaries, _throughput_stats(tokenizer, texts, summaries, elapsed, num_batches)
@@ -6,16 +6,48 @@ def load_input(path):
     with open(path) as f:
         return json.load(f)
 
-def generate_output_json(input_data, sections, subsections, output_path):
+def build_metadata(input_data):
+    return {
+        "input_documents": [doc['filename'] for doc in input_data['documents']],
+        "persona": input_data['persona']['role'],
+        "job_to_be_done": input_data['job_to_be_done']['task'],
+        "processing_timestamp": datetime.now().isoformat()
+    }
+
+def generate_output_json(input_data, sections, subsections, output_path, degradations=None):
     output = {
-        "metadata": {
-            "input_documents": [doc['filename'] for doc in input_data['documents']],
-            "persona": input_data['persona']['role'],
-            "job_to_be_done": input_data['job_to_be_done']['task'],
-            "processing_timestamp": datetime.now().isoformat()
-        },
+        "metadata": build_metadata(input_data),
         "extracted_sections": sections,
         "subsection_analysis": subsections
     }
+    # Only present in latency-SLO mode, so the default output format is unchanged
+    if degradations is not None:
+        output["metadata"]["degradations"] = degradations
     with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(output, f, indent=4, ensure_ascii=False)
\ No newline at end of file
+        json.dump(output, f, indent=4, ensure_ascii=False)
+
+
+class ProgressiveOutputWriter:
+    """
+    Streams results as JSON Lines while the pipeline runs: metadata first, then the extracted
+    sections as soon as they are ranked, then each subsection_analysis entry as its summary completes.
+    """
+
+    def __init__(self, input_data, path):
+        self.path = path
+        self.file = open(path, "w", encoding="utf-8")
+        self._write({"event": "metadata", "metadata": build_metadata(input_data)})
+
+    def _write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def write_sections(self, sections):
+        self._write({"event": "extracted_sections", "extracted_sections": sections})
+
+    def write_subsection(self, index, entry):
+        self._write({"event": "subsection_analysis", "index": index, "entry": entry})
+
+    def close(self, final_output_path):
+        self._write({"event": "complete", "output_path": str(final_output_path)})
+        self.file.close()